@@ -13,7 +13,11 @@ cd /
 
 # export PATH="/opt/conda/envs/tasks/bin:$PATH"
 
-inv -f ${workdir}/invoke.yml ${commands} > /output.txt
+# `status` reports every message as a JSON-line event in `AUTOBOT_EVENTS`, too
+events="/events.jsonl"
+rm -f ${events}
+
+AUTOBOT_EVENTS=${events} inv -f ${workdir}/invoke.yml ${commands} > /output.txt
 
 semester=$(grep -i semester ${workdir}/invoke.yml | cut -d " " -f 2)
 
@@ -22,7 +26,13 @@ status=${status//'%'/'%25'}
 status=${status//$'\n'/'%0A'}
 status=${status//$'\r'/'%0D'}
 
-exitcodes=$(echo ${status} | grep "Please add them" -c)
+# fail (1) if any Meeting (or Group) is missing authors, see `group.validate_syllabus`;
+#   it's used as an exit code, so it's clamped rather than a count (which could wrap)
+exitcodes=$(python -c '
+import sys, json
+tags = [json.loads(line).get("tag", "") for line in open(sys.argv[1])]
+print(min(tags.count("missing-authors"), 1))
+' ${events} 2> /dev/null || echo 0)
 
 echo "::set-output name=status::${status}"
 echo "::set-output name=semester::${semester}"
@@ -3,17 +3,12 @@ import json
 from pathlib import Path
 
 from invoke import task
-from ruamel.yaml import YAML
-from pandas import Timestamp
-from jinja2 import Environment, PackageLoader
 
-from .concepts import Group, Meeting
-
-
-yaml = YAML()
-
-yaml.register_class(Group)
-yaml.register_class(Meeting)
+# NOTE `yaml` and `j2env` pull in ruamel, pandas, and jinja2 – so they're only built
+#   the first time a task asks for them (see `__getattr__`). Modules collected by
+#   `inv` should import them (and other heavy dependencies) inside their tasks, which
+#   keeps `inv --list` and the like fast.
+_lazy = {}
 
 
 def _repr_timestamp(representer, data):
@@ -21,21 +16,77 @@ def _repr_timestamp(representer, data):
 
 
 def _init_timestamp(loader, data):
+    from pandas import Timestamp
+
     data = loader.construct_scalar(data)
     return Timestamp(data)
 
 
-yaml.representer.add_representer(type(Timestamp(None)), _repr_timestamp)
-yaml.representer.add_representer(Timestamp, _repr_timestamp)
-yaml.constructor.add_constructor("!Timestamp", _init_timestamp)
+def _make_yaml():
+    from ruamel.yaml import YAML
+    from pandas import Timestamp
+
+    from .concepts import Group, Meeting
+
+    yaml = YAML()
+
+    yaml.register_class(Group)
+    yaml.register_class(Meeting)
+
+    yaml.representer.add_representer(type(Timestamp(None)), _repr_timestamp)
+    yaml.representer.add_representer(Timestamp, _repr_timestamp)
+    yaml.constructor.add_constructor("!Timestamp", _init_timestamp)
+
+    return yaml
+
+
+def _make_j2env():
+    from jinja2 import Environment, PackageLoader
+
+    j2env = Environment(loader=PackageLoader("tasks", "src/templates"),)
+    j2env.filters["jsonify"] = json.dumps
+
+    return j2env
 
-j2env = Environment(loader=PackageLoader("tasks", "src/templates"),)
-j2env.filters["jsonify"] = json.dumps
 
+def __getattr__(name):
+    makers = {"yaml": _make_yaml, "j2env": _make_j2env}
+    if name not in makers:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def read_from_disk(ctx, group="", semester=""):
-    config = yaml.load(open(Path(__file__).parent.parent / "config.yml", "r"))
-    ctx["settings"] = config
+    if name not in _lazy:
+        _lazy[name] = makers[name]()
+
+    return _lazy[name]
+
+
+def load_config():
+    """Parses `config.yml`, but only again once it changes on disk.
+
+    Batches (see `org`) read it once for every Group and semester they process, and
+    forked workers inherit it.
+    """
+    from . import yaml
+
+    path = Path(__file__).parent.parent / "config.yml"
+    mtime = path.stat().st_mtime_ns
+
+    if _lazy.get("config", (None,))[0] != mtime:
+        _lazy["config"] = (mtime, yaml.load(open(path, "r")))
+
+    return _lazy["config"][1]
+
+
+def read_from_disk(ctx, group="", semester="", roundtrip=False):
+    """Loads the settings, Group, and Syllabus into `ctx`.
+
+    :params roundtrip: whether the Group and Syllabus will be dumped back to YAML (if
+        not, they're loaded from a compiled cache, see `tools.yamlcache`)
+    """
+    from .concepts import Group
+    from .tools import yamlcache
+
+    ctx["settings"] = load_config()
 
     # Prefer values set in Context over arguments
     if not group and hasattr(ctx, "group") and ctx.group:
@@ -53,7 +104,7 @@ def read_from_disk(ctx, group="", semester=""):
 
     try:
         if not isinstance(group, Group):
-            group = yaml.load(open(path / "group.yml", "r"))
+            group = yamlcache.load(path / "group.yml", roundtrip=roundtrip)
     except FileNotFoundError:
         if not semester:
             from .tools import cal
@@ -77,7 +128,7 @@ def read_from_disk(ctx, group="", semester=""):
         ctx["path"] = path
 
     try:
-        syllabus = yaml.load(open(ctx.path / "syllabus.yml", "r"))
+        syllabus = yamlcache.load(ctx.path / "syllabus.yml", roundtrip=roundtrip)
     except FileNotFoundError:
         syllabus = []
     finally:
@@ -87,13 +138,18 @@ def read_from_disk(ctx, group="", semester=""):
 
 
 def read_and_flatten(ctx, **kwargs):
+    from .concepts import Syllabus
+
     ctx = read_from_disk(ctx, **kwargs)
-    ctx.syllabus = [m.flatten() for m in ctx.syllabus]
+    ctx.syllabus = Syllabus([m.flatten() for m in ctx.syllabus])
 
     return ctx
 
 
 __all__ = [
+    "bench",
     "group",
     "meeting",
+    "org",
+    "semester",
 ]
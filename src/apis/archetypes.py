@@ -0,0 +1,117 @@
+"""Renders Hugo archetypes natively, i.e. `hugo new` without Hugo.
+
+Only the Go-template actions our archetypes actually use are supported; anything else
+raises :class:`Unsupported`, so callers can fall back to running `hugo new` in the
+container. Like `hugo new`, existing content is never overwritten.
+"""
+import re
+import shlex
+from pathlib import Path
+from datetime import datetime, timezone
+
+action = re.compile(r"{{-?\s*(.*?)\s*-?}}", flags=re.DOTALL)
+
+
+class Unsupported(Exception):
+    pass
+
+
+def find(site_src: Path, kind: str, theme: str = "") -> Path:
+    """Looks up an archetype the way Hugo does: the site's first, then the theme's.
+
+    Directory archetypes (page bundles) win over single-file archetypes.
+    """
+    roots = [site_src / "archetypes"]
+    if theme:
+        roots.append(site_src / "themes" / theme / "archetypes")
+
+    for root in roots:
+        for candidate in [root / kind, root / f"{kind}.md"]:
+            if candidate.exists():
+                return candidate
+
+    raise Unsupported(f"No archetype for `{kind}`.")
+
+
+def new(site_src: Path, kind: str, path: str, theme: str = "") -> list:
+    """Materializes archetype `kind` at `content/<path>`.
+
+    :returns: list of the files that were created (empty if everything existed)
+    """
+    archetype = find(site_src, kind, theme)
+    target = site_src / "content" / path
+
+    if archetype.is_dir():
+        sources = {f: target / f.relative_to(archetype) for f in archetype.rglob("*")}
+        name = target.name
+    else:
+        sources = {archetype: target}
+        name = target.stem
+
+    variables = {
+        ".Name": name,
+        ".File.ContentBaseName": name,
+        ".Type": kind,
+        ".Kind": "section" if name == "_index" else "page",
+    }
+
+    # Render everything first, so unsupported archetypes don't leave partial output
+    rendered = {}
+    for source, dest in sources.items():
+        if source.is_dir() or dest.exists():
+            continue
+
+        if source.suffix in [".md", ".html"]:
+            if ".Date" not in variables:
+                now = datetime.now(timezone.utc).replace(microsecond=0)
+                variables[".Date"] = now.isoformat()
+            rendered[dest] = render(source.read_text(), variables)
+        else:
+            rendered[dest] = source.read_bytes()
+
+    for dest, contents in rendered.items():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(contents, str):
+            dest.write_text(contents)
+        else:
+            dest.write_bytes(contents)
+
+    return sorted(rendered.keys())
+
+
+def render(template: str, variables: dict) -> str:
+    return action.sub(lambda match: _evaluate(match.group(1), variables), template)
+
+
+def _evaluate(expression: str, variables: dict) -> str:
+    """Evaluates a (small) subset of Go-template pipelines, e.g.
+    `{{ replace .Name "-" " " | title }}`.
+    """
+    value = None
+    for command in expression.split("|"):
+        try:
+            fn, *args = shlex.split(command.strip())
+        except ValueError:
+            raise Unsupported(f"Can't parse `{expression}`.")
+
+        # pipelines pass the previous value as the _last_ argument
+        args = [variables.get(arg, arg) for arg in args]
+        if value is not None:
+            args.append(value)
+
+        if fn in variables and not args:
+            value = variables[fn]
+        elif fn == "replace" and len(args) == 3:
+            value = args[0].replace(args[1], args[2])
+        elif fn == "title" and len(args) == 1:
+            value = args[0].title()
+        elif fn == "lower" and len(args) == 1:
+            value = args[0].lower()
+        elif fn == "upper" and len(args) == 1:
+            value = args[0].upper()
+        elif fn == "humanize" and len(args) == 1:
+            value = args[0].replace("-", " ").replace("_", " ").capitalize()
+        else:
+            raise Unsupported(f"Can't evaluate `{expression}`.")
+
+    return str(value)
@@ -1,16 +1,19 @@
 import re
 import os
+import time
+import fcntl
+import atexit
 from pathlib import Path
 from typing import Tuple
 from functools import cmp_to_key
+from contextlib import contextmanager
 
 from invoke import task
-import docker
 from jinja2 import Template
 
 from .. import read_from_disk
 from ..concepts import Coordinator, Group, Meeting
-from ..tools import EditableFM, status, urls, sort
+from ..tools import EditableFM, FMBatch, status, urls, sort, trace, pool
 from ..meeting import search
 
 
@@ -39,7 +42,7 @@ templates = {
 _hugo_path = Path()
 
 
-def hugo_via_container(ctx, name: str = "hugo"):
+def _site_src(ctx) -> str:
     if os.environ.get("GITHUB_ACTIONS", False):
         site_src = f"/{ctx.settings.hugo.repo}"
     else:
@@ -48,24 +51,197 @@ def hugo_via_container(ctx, name: str = "hugo"):
     global _hugo_path
     _hugo_path = Path(site_src)
 
-    client = docker.from_env()
+    return site_src
+
 
+@contextmanager
+def site_lock(ctx):
+    """Serializes edits to content shared by all Groups (e.g. author pages).
+
+    Groups published concurrently (see `org`) each run in their own process, so this
+    locks the site's `content` directory, rather than using a thread lock.
+    """
+    content = Path(_site_src(ctx)) / "content"
+    lock = os.open(content, os.O_RDONLY)
     try:
-        container = client.containers.get(name)
-        container.unpause()
-    except docker.errors.NotFound:
-        container = client.containers.create(
-            image=ctx.settings.hugo.image,
-            auto_remove=False,
-            detach=False,
-            environment={"HUGO_THEME": "academic", "HUGO_WATCH": "true",},
-            volumes={f"{site_src}": {"bind": "/src", "mode": "rw",},},
-            working_dir="/src",
-            name=name,
-        ) 
-        container.start()
-
-    return container, site_src
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(lock)
+
+
+class HugoSession:
+    """Keeps one Docker client, and the Hugo container running, for a whole `inv` run.
+
+    The container is unpaused the first time it's needed, and paused when the session
+    closes (when the process exits, or at the end of each call on a `pool` worker) —
+    unless another process still has a session open; each open session holds a shared
+    lock on the site's directory, and only whoever gets it exclusively pauses. Time
+    spent talking to Docker is tallied in `elapsed`.
+    """
+
+    separator = "--- autobot ---"
+
+    def __init__(self, ctx, name: str = "hugo"):
+        self.ctx = ctx
+        self.name = name
+        self.site_src = _site_src(ctx)
+
+        self.client = None
+        self.container = None
+        self.lock = None
+        self.elapsed = 0.0
+        self.calls = 0
+
+        atexit.register(self.close)
+
+    def open(self):
+        if self.container is not None:
+            return self.container
+
+        import docker
+
+        start = time.perf_counter()
+        # waits for anyone that's pausing the container, and keeps it from being paused
+        #   until this session closes
+        self.lock = os.open(self.site_src, os.O_RDONLY)
+        fcntl.flock(self.lock, fcntl.LOCK_SH)
+        self.client = docker.from_env()
+
+        try:
+            self.container = self.client.containers.get(self.name)
+            if self.container.status == "paused":
+                self.container.unpause()
+        except docker.errors.NotFound:
+            self.container = self.client.containers.create(
+                image=self.ctx.settings.hugo.image,
+                auto_remove=False,
+                detach=False,
+                environment={"HUGO_THEME": "academic", "HUGO_WATCH": "true",},
+                volumes={f"{self.site_src}": {"bind": "/src", "mode": "rw",},},
+                working_dir="/src",
+                name=self.name,
+            )
+            self.container.start()
+
+        self._tally(start)
+
+        return self.container
+
+    def run(self, *commands: str) -> list:
+        """Runs all `commands` in the container, using a single `exec_run`.
+
+        :returns: list with each command's output
+        """
+        container = self.open()
+
+        start = time.perf_counter()
+        script = f" ; echo '{self.separator}' ; ".join(commands)
+        with trace.span("docker exec"):
+            res = container.exec_run(["sh", "-c", script])
+        self._tally(start)
+
+        return res.output.decode("utf-8").split(f"{self.separator}\n")
+
+    def close(self):
+        if self.container is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            fcntl.flock(self.lock, fcntl.LOCK_UN)
+            fcntl.flock(self.lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            pass  # still in use elsewhere; whoever closes last pauses it
+        else:
+            self.container.pause()
+        finally:
+            os.close(self.lock)
+        self.client.close()
+        self._tally(start)
+
+        self.container, self.client, self.lock = None, None, None
+        status.success(
+            f"Spent {self.elapsed:.2f}s on {self.calls} Hugo container operation(s)."
+        )
+        self.elapsed, self.calls = 0.0, 0
+
+    def _tally(self, start: float):
+        self.elapsed += time.perf_counter() - start
+        self.calls += 1
+
+
+_session = None
+
+
+def session(ctx) -> HugoSession:
+    """Returns this process' `HugoSession`, creating it if needed."""
+    global _session
+    if _session is None:
+        _session = HugoSession(ctx)
+
+    return _session
+
+
+def _forget_session():
+    # Forked workers get their own client, rather than sharing the parent's socket
+    global _session
+    _session = None
+
+
+def close_session():
+    """Closes this process' `HugoSession`, if it has one."""
+    if _session is not None:
+        _session.close()
+
+
+os.register_at_fork(after_in_child=_forget_session)
+# workers exit without running `atexit`, so their sessions are closed after each call
+pool.teardown(close_session)
+
+
+def hugo_via_container(ctx, name: str = "hugo"):
+    hugo = session(ctx)
+    return hugo.open(), hugo.site_src
+
+
+def new_content(ctx, kind: str, path: str) -> bool:
+    """Mimics `hugo new --kind <kind> <path>`.
+
+    :returns: whether any content was created
+    """
+    return new_contents(ctx, [(kind, path)])[path]
+
+
+def new_contents(ctx, items: list) -> dict:
+    """Mimics `hugo new --kind <kind> <path>` for every `(kind, path)` in `items`.
+
+    Archetypes are rendered natively when possible, so Docker is only needed for the
+    archetypes we can't render (and actual site builds). Those are all created with a
+    single `exec_run`.
+
+    :returns: dict mapping each `path` to whether any content was created for it
+    """
+    from . import archetypes
+
+    site_src = Path(_site_src(ctx))
+
+    created, unsupported = {}, []
+    for kind, path in items:
+        try:
+            created[path] = bool(
+                archetypes.new(site_src, kind, path, ctx.settings.hugo.theme)
+            )
+        except archetypes.Unsupported:
+            unsupported.append((kind, path))
+
+    if unsupported:
+        commands = [command.render(kind=kind, path=path) for kind, path in unsupported]
+        outputs = session(ctx).run(*commands)
+        for (_, path), output in zip(unsupported, outputs):
+            created[path] = "created" in output
+
+    return created
 
 
 def touch_group(ctx):
@@ -76,12 +252,8 @@ def touch_group(ctx):
 
     :returns: None
     """
-    container, _ = hugo_via_container(ctx)
-    group_path = f"groups{ctx.group.name}"
-    new_author = command.render(kind="semester", path=group_path,)
-
-    res = container.exec_run(new_author)
-    output = res.output.decode("utf-8")
+    group_path = f"groups/{ctx.group.name}"
+    new_content(ctx, "semester", group_path)
 
     # editor = EditableFM(f"{site_src}/content/{group_path}")
     # editor.load("_index.md")
@@ -99,18 +271,13 @@ def touch_semester(ctx):
 
     :returns: None
     """
-    container, site_src = hugo_via_container(ctx)
-    # import pdb; pdb.set_trace()
+    site_src = _site_src(ctx)
     group_path = f"groups/{repr(ctx.group)}"
-    new_semester = command.render(kind="semester", path=group_path,)
 
     expanded_path = f"{site_src}/content/{group_path}"
     Path(expanded_path).mkdir(exist_ok=True)
 
-    res = container.exec_run(new_semester)
-    output = res.output.decode("utf-8")
-
-    if "create" in output:
+    if new_content(ctx, "semester", group_path):
         status.success(f"Created `{ctx.path}/_index.md`.")
 
     editor = EditableFM(expanded_path)
@@ -122,101 +289,148 @@ def touch_semester(ctx):
 
     editor.dump()
 
-    container.pause()
 
+def _author_roles(ctx) -> dict:
+    """Maps every author in the Group to their `user_groups` and role, in one pass.
 
-def touch_author(ctx, author=""):
-    """Creates an author page everyone that contributes to a semester's content.
+    If someone's listed more than once, the more senior listing wins.
+    """
+    listings = [
+        ("advis", ctx.group.advisors, "Advisor"),
+        ("guest", ctx.group.guests, "Guest"),
+        ("coord", ctx.group.coordinators, "Coordinator"),
+        ("direc", ctx.group.directors, "Director"),
+    ]
 
-    :params ctx: Invoke Context that should contain: .Group
+    roles = {}
+    for key, authors, title in listings:
+        groups = [x.render(ctx=ctx) for x in templates[key]] + [title]
+        roles.update({author.lower(): groups for author in authors})
 
-    :returns: None
-    """
-    container, site_src = hugo_via_container(ctx)
+    return roles
 
-    author_path = f"authors/{author}/"
-    new_author = command.render(kind="author", path=author_path,)
 
-    res = container.exec_run(new_author)
-    output = res.output.decode("utf-8")
+def _sort_user_groups(groups) -> list:
+    non_sem = filter(lambda x: not re.match("(fa|sp|su)\d{2}", x), groups)
+    isa_sem = filter(lambda x: bool(re.match("(fa|sp|su)\d{2}", x)), groups)
 
-    editor = EditableFM(f"{site_src}/content/{author_path}")
-    editor.load("_index.md")
+    groups = sorted(list(non_sem))
+    # pre-sorting by name keeps ties in order, so unchanged pages stay unchanged
+    groups += sorted(sorted(isa_sem), key=sort.roles, reverse=True)
+
+    return groups
 
-    teams = set(editor.fm["ucfai"]["teams"] + [ctx.group.semester])
-    editor.fm["ucfai"]["teams"] = sorted(list(teams), key=sort.semester, reverse=True)
-
-    if author in map(str.lower, ctx.group.directors):
-        groups = [x.render(ctx=ctx) for x in templates["direc"]] + ["Director", ]
-    elif author in map(str.lower, ctx.group.coordinators):
-        groups = [x.render(ctx=ctx) for x in templates["coord"]] + ["Coordinator", ]
-    elif author in map(str.lower, ctx.group.guests):
-        groups = [x.render(ctx=ctx) for x in templates["guest"]] + ["Guest", ]
-    elif author in map(str.lower, ctx.group.advisors):
-        groups = [x.render(ctx=ctx) for x in templates["advis"]] + ["Advisor", ]
-    else:
-        groups = []
+
+def _add_author(ctx, fm, groups: list):
+    """Sets the Group's semester, `groups`, and role on an author's front matter.
+
+    Whatever the Group gave them before is dropped first (see `_remove_author`), so
+    someone who changed roles doesn't keep their old one.
+    """
+    _remove_author(ctx, fm)
+
+    teams = set(fm["ucfai"]["teams"] + [ctx.group.semester])
+    fm["ucfai"]["teams"] = sorted(list(teams), key=sort.semester, reverse=True)
 
     try:
         roles = [groups[-1]]
     except IndexError:
         roles = []
 
-    # region Semi-Complex Group filtering/sorting
-    groups = set(editor.fm["user_groups"] + groups)
+    fm["user_groups"] = _sort_user_groups(set(fm["user_groups"] + groups))
 
-    non_sem = filter(lambda x: not re.match("(fa|sp|su)\d{2}", x), groups)
-    isa_sem = filter(lambda x: bool(re.match("(fa|sp|su)\d{2}", x)), groups)
+    roles = set(fm["ucfai"]["roles"] + roles)
+    fm["ucfai"]["roles"] = sorted(list(roles))
 
-    groups = sorted(list(non_sem))
-    groups += sorted(list(isa_sem), key=sort.roles, reverse=True)
 
-    editor.fm["user_groups"] = groups
-    # endregion
+def _remove_author(ctx, fm):
+    """Removes the Group's semester, and its `user_groups`, from an author's page.
 
-    roles = set(editor.fm["ucfai"]["roles"] + roles)
-    editor.fm["ucfai"]["roles"] = sorted(list(roles))
+    Semester-wide roles (e.g. `fa20-director`) and the semester's team are only removed
+    if the author holds no role in another Group that semester.
+    """
+    group_roles = {x.render(ctx=ctx) for key in templates for x in templates[key][:1]}
+    semester_roles = {
+        x.render(ctx=ctx) for key in templates for x in templates[key][1:]
+    }
 
-    editor.dump()
+    groups = [x for x in fm["user_groups"] if x not in group_roles]
 
-    container.pause()
+    semester = f"{ctx.group.semester}-"
+    elsewhere = [
+        x for x in groups if x.startswith(semester) and x not in semester_roles
+    ]
+    if not elsewhere:
+        groups = [x for x in groups if x not in semester_roles]
+        teams = fm["ucfai"]["teams"]
+        fm["ucfai"]["teams"] = [x for x in teams if x != ctx.group.semester]
 
+    fm["user_groups"] = groups
 
-def cleanup_authors(ctx):
-    """Ensure author activity on site matches repository activity.
+
+def touch_author(ctx, author=""):
+    """Creates an author page everyone that contributes to a semester's content.
 
     :params ctx: Invoke Context that should contain: .Group
 
     :returns: None
     """
-    container, site_src = hugo_via_container(ctx)
-    authors = Path(f"{site_src}/content/authors")
+    site_src = _site_src(ctx)
 
-    group = ctx["group"]
-    _templates = [x.render(group=group) for x in templates]
+    author_path = f"authors/{author}/"
+    with site_lock(ctx):
+        new_content(ctx, "author", author_path)
 
-    for author in authors.iterdir():
-        editor = EditableFM(author)
+        editor = EditableFM(f"{site_src}/content/{author_path}")
         editor.load("_index.md")
 
-        if author.stem not in ctx.group.authors():
-            for template in _templates:
-                try:
-                    index = editor.fm["user_groups"].index(template)
-                    del editor.fm["user_groups"][index]
-                except ValueError:
-                    pass
-
-            try:
-                index = editor.fm["ucfai"]["teams"].index(ctx.group.semester)
-                del editor.fm["ucfai"]["teams"][index]
-            except ValueError:
-                pass
+        _add_author(ctx, editor.fm, _author_roles(ctx).get(author, []))
 
         editor.dump()
-    status.success("Cleaned up roles.")
 
-    container.pause()
+
+def reconcile_authors(ctx) -> Tuple[int, int]:
+    """Makes every author page on the site agree with the Group, in a single pass.
+
+    The desired `teams`, `roles`, and `user_groups` of each of the Group's authors are
+    worked out once; missing pages are created together; and of everyone else, only
+    pages that mention the Group's semester get parsed (to drop its roles). Only pages
+    that actually change are written.
+
+    :params ctx: Invoke Context that should contain: .Group
+
+    :returns: number of pages written, and number of pages looked at
+    """
+    site_src = Path(_site_src(ctx))
+    authors = site_src / "content" / "authors"
+
+    desired = _author_roles(ctx)
+
+    # Other Groups may be reconciling the same pages (see `org`)
+    with site_lock(ctx):
+        new_contents(ctx, [("author", f"authors/{author}/") for author in desired])
+
+        batch = FMBatch()
+        for page in authors.glob("*/_index.md"):
+            author = page.parent.name
+            if author in desired:
+                _add_author(ctx, batch.edit(page).fm, desired[author])
+            elif ctx.group.semester in page.read_text():
+                _remove_author(ctx, batch.edit(page).fm)
+
+        looked_at = len(batch.editors)
+        return batch.flush(), looked_at
+
+
+def cleanup_authors(ctx):
+    """Ensure author activity on site matches repository activity.
+
+    :params ctx: Invoke Context that should contain: .Group
+
+    :returns: None
+    """
+    reconcile_authors(ctx)
+    status.success("Cleaned up roles.")
 
 
 def touch_post(ctx, m, weight=-1, **kwargs):
@@ -226,34 +440,59 @@ def touch_post(ctx, m, weight=-1, **kwargs):
 
     :returns: None
     """
-    container, site_src = hugo_via_container(ctx)
+    site_src = _site_src(ctx)
 
     meeting_path = f"groups/{ctx.group.name}/{ctx.group.semester}"
     meeting_file = f"{m.filename}.md"
-    new_meeting_post = command.render(
-        kind="group-meeting", path=f"{meeting_path}/{meeting_file}"
-    )
-    res = container.exec_run(new_meeting_post)
-    output = res.output.decode("utf-8")
+    new_content(ctx, "group-meeting", f"{meeting_path}/{meeting_file}")
 
     editor = EditableFM(f"{site_src}/content/{meeting_path}")
     editor.load(meeting_file)
 
-    container.pause()
-
     return editor
 
 
-def load_data(path, key):
+# site data, indexed by path: (mtime, parsed YAML), so each `data/*.yml` is only parsed
+#   again once it changes on disk
+_data = {}
+_officer_ranks = (None, {})
+
+
+def _load_data(path) -> Tuple[int, object]:
     from .. import yaml
+
     if "yml" not in path:
         path += ".yml"
 
     global _hugo_path
+    path = _hugo_path / "data" / path
+
+    mtime = path.stat().st_mtime_ns
+    if path not in _data or _data[path][0] != mtime:
+        _data[path] = (mtime, yaml.load(path))
+
+    return _data[path]
+
 
-    data = yaml.load(_hugo_path / "data" / path)
+def load_data(path, key):
+    _, data = _load_data(path)
 
     try:
         return data[key]
     except KeyError:
         return data
+
+
+def officer_ranks() -> dict:
+    """Maps each officer (as `some-officer`) to its 1-based position in `officers`.
+
+    The table is only rebuilt when the site's `data/config.yml` changes.
+    """
+    global _officer_ranks
+
+    mtime, data = _load_data("config.yml")
+    if _officer_ranks[0] != mtime:
+        officers = [x.lower().replace(" ", "-") for x in data["officers"]]
+        _officer_ranks = (mtime, {x: idx + 1 for idx, x in enumerate(officers)})
+
+    return _officer_ranks[1]
@@ -1,20 +1,54 @@
 import json
 import os
+import time
+import fcntl
 from hashlib import sha256
 from typing import Tuple
 from pathlib import Path
 
-import requests
 from invoke import task
 
 from .. import j2env, read_from_disk
 from ..concepts import Meeting
 
 
-def _set_config_dir(ctx):
+def _set_config_dir(ctx) -> Path:
     config = Path(__file__).parent.parent / "templates" / "kaggle"
     os.environ["KAGGLE_CONFIG_DIR"] = str(config)
-    ctx.run(f"chmod 600 {config / 'kaggle.json'}")
+    if (config / "kaggle.json").exists():
+        os.chmod(config / "kaggle.json", 0o600)
+
+    return config
+
+
+_client = None
+
+
+def client(ctx):
+    """Returns this process' (shared) Kaggle API client."""
+    from .kaggle_api import KaggleClient, credentials
+
+    global _client
+    if _client is None:
+        username, key = credentials(_set_config_dir(ctx))
+        _client = KaggleClient(
+            username,
+            key,
+            base_url=ctx.settings.kaggle.api_url,
+            rate=ctx.settings.kaggle.rate,
+            retries=ctx.settings.kaggle.retries,
+        )
+
+    return _client
+
+
+def _forget_client():
+    # Forked workers get their own session, rather than sharing the parent's sockets
+    global _client
+    _client = None
+
+
+os.register_at_fork(after_in_child=_forget_client)
 
 
 def _decrypt_key(ctx):
@@ -77,42 +111,106 @@ def _pull_kernel(ctx, m: Meeting):
     _username = ctx.settings.kaggle.username
     _workbook = ctx.settings.suffixes.workbook
 
-    existence_test = requests.get(
-        f"https://kaggle.com/{_username}/{slug_kernel(ctx, m)}"
-    )
-
-    if existence_test.status_code != requests.codes.OK:
+    kernel = client(ctx).pull_kernel(slug_kernel(ctx, m), owner=_username)
+    if kernel is None:
         return None
-    else:
-        kaggle_cmd = "kaggle k pull -p /tmp"
-        ctx.run(f"{kaggle_cmd} {_username}/{slug_kernel(ctx, m)}")
-        return Path("/tmp") / f"{slug_kernel(ctx, m)}{_workbook}"
+
+    path = Path("/tmp") / f"{slug_kernel(ctx, m)}{_workbook}"
+    path.write_text(kernel["blob"]["source"])
+    return path
 
 
-def _diff_kernel(ctx, m: Meeting, remote: Path):
-    """Uses `sha256` on local Workbook and Kaggle Kernel to determine if they differ.
+def _hash_notebook(path: Path) -> str:
+    """Hashes a Notebook's content, ignoring anything volatile.
+
+    Outputs, execution counts, cell ids and the Notebook's metadata (other than our
+    own `autobot` entry) differ between a local Workbook and what Kaggle hands back, so
+    they're left out. The Notebook is parsed whole (outputs and all); only the hashed
+    fields are re-serialized, one cell at a time.
     """
-    _workbook = ctx.settings.suffixes.workbook
-    local = ctx["path"] / str(m) / f"{m.filename}{_workbook}"
+    with open(path, "r") as f:
+        nb = json.load(f)
+
+    digest = sha256()
+    autobot = nb.get("metadata", {}).get("autobot", {})
+    digest.update(json.dumps(autobot, sort_keys=True).encode("utf-8"))
+
+    for cell in nb.get("cells", []):
+        source = cell.get("source", "")
+        if isinstance(source, list):
+            source = "".join(source)
 
-    remote_hash = sha256(open(remote, "rb").read()).hexdigest()
-    local_hash = sha256(open(local, "rb").read()).hexdigest()
+        tags = cell.get("metadata", {}).get("tags", [])
+        normalized = [cell.get("cell_type", ""), source.strip(), sorted(tags)]
+        digest.update(json.dumps(normalized).encode("utf-8"))
 
-    return remote_hash != local_hash
+    return digest.hexdigest()
 
 
-def push_kernel(ctx, m: Meeting):
-    """Pushes a Meeting's local Workbook to Kaggle Kernels.
+def _ledger_path(ctx) -> Path:
+    return ctx.path / ".kaggle.json"
+
+
+def _load_ledger(ctx) -> dict:
+    try:
+        return json.load(open(_ledger_path(ctx), "r"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _record_push(ctx, slug: str, digest: str):
+    """Records `digest` as what Kaggle has for `slug`.
+
+    Meetings may be published in parallel, so the ledger is locked while it's updated.
     """
-    _set_config_dir(ctx)
-    path = _pull_kernel(ctx, m)
-    diff = _diff_kernel(ctx, m, path) if path else True
+    with open(_ledger_path(ctx), "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        try:
+            ledger = json.loads(f.read() or "{}")
+        except ValueError:
+            ledger = {}
+
+        ledger[slug] = {"sha": digest, "verified": time.time()}
+
+        f.seek(0)
+        f.truncate()
+        json.dump(ledger, f, indent=2, sort_keys=True)
+
 
-    if diff:
-        with ctx.cd(str(ctx.path / str(m))):
-            ctx.run("kaggle k push")
+def push_kernel(ctx, m: Meeting) -> bool:
+    """Pushes a Meeting's local Workbook to Kaggle Kernels, if it differs from Kaggle's.
+
+    What Kaggle has is taken from the ledger, which is trusted for `kaggle.ledger_ttl`
+    seconds; after that (or if the Kernel isn't in the ledger) the Kernel is pulled and
+    compared, and the ledger is updated.
+
+    :returns: whether the Workbook was pushed
+    """
+    _workbook = ctx.settings.suffixes.workbook
+    local = _hash_notebook(ctx.path / str(m) / f"{m.filename}{_workbook}")
+
+    slug = slug_kernel(ctx, m)
+    entry = _load_ledger(ctx).get(slug, {})
+    trusted = entry and time.time() - entry["verified"] < ctx.settings.kaggle.ledger_ttl
+
+    if trusted:
+        remote = entry["sha"]
     else:
-        raise ValueError("Kernels are the same")
+        path = _pull_kernel(ctx, m)
+        remote = _hash_notebook(path) if path else ""
+
+    pushed = remote != local
+    if pushed:
+        folder = ctx.path / str(m)
+        metadata = json.load(open(folder / "kernel-metadata.json", "r"))
+        source = open(folder / metadata["code_file"], "r").read()
+        client(ctx).push_kernel(metadata, source)
+
+    if pushed or not trusted:
+        _record_push(ctx, slug, local)
+
+    return pushed
 
 
 def create_competition(ctx):
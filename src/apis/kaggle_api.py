@@ -0,0 +1,202 @@
+"""A small, in-process client for Kaggle's REST API.
+
+This replaces shelling out to the `kaggle` CLI: every request goes through one pooled
+session, is rate-limited client-side, and is retried (with exponential backoff) when
+Kaggle answers `429`/`5xx` or the connection drops. The base URL is configurable
+(`kaggle.api_url`), so the client can be pointed at a local stand-in server.
+
+More info on the endpoints:
+    https://github.com/Kaggle/kaggle-api/blob/master/KaggleSwagger.yaml
+"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class KaggleError(Exception):
+    pass
+
+
+class KaggleClient:
+    def __init__(
+        self,
+        username: str,
+        key: str,
+        base_url: str = "https://www.kaggle.com/api/v1",
+        rate: float = 2.0,
+        retries: int = 5,
+        timeout: float = 30,
+    ):
+        self.username = username
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.auth = (username, key)
+        # for URLs Kaggle hands out (e.g. to upload files to), which mustn't see the key
+        self.anonymous = requests.Session()
+        for session in [self.session, self.anonymous]:
+            session.mount("http://", HTTPAdapter(pool_maxsize=8))
+            session.mount("https://", HTTPAdapter(pool_maxsize=8))
+
+        # at most `rate` requests per second, shared by all threads
+        self._interval = 1 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def _wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def request(
+        self, method: str, endpoint: str, auth: bool = True, **kwargs
+    ) -> requests.Response:
+        """Makes a rate-limited request, retrying transient failures.
+
+        `endpoint`s are relative to `base_url`, unless they're absolute URLs. Every
+        attempt resends the same `kwargs`, so a `data` to upload must be `bytes` (a file
+        object would be at EOF on the retry).
+
+        :params auth: whether to send Kaggle's credentials (only ever to Kaggle)
+        """
+        url = endpoint if "://" in endpoint else f"{self.base_url}/{endpoint}"
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session if auth else self.anonymous
+
+        for attempt in range(self.retries + 1):
+            self._wait()
+            try:
+                res = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                time.sleep(2 ** attempt)
+                continue
+
+            if res.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return res
+
+            try:
+                backoff = float(res.headers.get("Retry-After", 2 ** attempt))
+            except ValueError:
+                backoff = 2 ** attempt
+            time.sleep(backoff)
+
+        return res
+
+    def _json(self, method: str, endpoint: str, **kwargs) -> dict:
+        res = self.request(method, endpoint, **kwargs)
+        if res.status_code != requests.codes.OK:
+            raise KaggleError(f"{method} {endpoint}: {res.status_code} {res.text}")
+
+        body = res.json()
+        if isinstance(body, dict) and body.get("error", ""):
+            raise KaggleError(f"{method} {endpoint}: {body['error']}")
+
+        return body
+
+    # region Kernels
+    def push_kernel(self, metadata: dict, source: str) -> dict:
+        """Pushes a Kernel, as described by a `kernel-metadata.json`, with `source`."""
+        request = {
+            "slug": metadata["id"],
+            "newTitle": metadata.get("title", None),
+            "text": source,
+            "language": metadata.get("language", "python"),
+            "kernelType": metadata.get("kernel_type", "notebook"),
+            "isPrivate": metadata.get("is_private", False),
+            "enableGpu": metadata.get("enable_gpu", False),
+            "enableInternet": metadata.get("enable_internet", True),
+            "datasetDataSources": metadata.get("dataset_sources", []),
+            "competitionDataSources": metadata.get("competition_sources", []),
+            "kernelDataSources": metadata.get("kernel_sources", []),
+            "categoryIds": metadata.get("keywords", []),
+        }
+
+        return self._json("POST", "kernels/push", json=request)
+
+    def pull_kernel(self, slug: str, owner: str = "") -> dict:
+        """Pulls a Kernel's latest source and metadata.
+
+        :returns: dict with `metadata` and `blob` (whose `source` is the Kernel's code),
+            or `None` if the Kernel doesn't exist
+        """
+        params = {"userName": owner or self.username, "kernelSlug": slug}
+        res = self.request("GET", "kernels/pull", params=params)
+        if res.status_code == requests.codes.NOT_FOUND:
+            return None
+        if res.status_code != requests.codes.OK:
+            raise KaggleError(f"GET kernels/pull: {res.status_code} {res.text}")
+
+        return res.json()
+
+    def kernel_status(self, slug: str, owner: str = "") -> dict:
+        params = {"userName": owner or self.username, "kernelSlug": slug}
+        return self._json("GET", "kernels/status", params=params)
+
+    # endregion
+
+    # region Datasets
+    def upload_file(self, path: Path) -> str:
+        """Uploads a file for use in a Dataset (version).
+
+        :returns: the token to reference the file by
+        """
+        path = Path(path)
+        stat = path.stat()
+        endpoint = f"datasets/upload/file/{stat.st_size}/{int(stat.st_mtime)}"
+        upload = self._json("POST", endpoint, data={"fileName": path.name})
+
+        # `createUrl` is on Kaggle's storage provider, not Kaggle
+        blob = path.read_bytes()
+        res = self.request("PUT", upload["createUrl"], auth=False, data=blob)
+        if res.status_code not in [requests.codes.OK, requests.codes.CREATED]:
+            raise KaggleError(f"PUT {path.name}: {res.status_code} {res.text}")
+
+        return upload["token"]
+
+    def upload_dataset(self, slug: str, files: list, title: str = "", notes: str = ""):
+        """Creates the Dataset `slug`, or adds a new version if it already exists."""
+        tokens = [{"token": self.upload_file(path)} for path in files]
+
+        params = {"userName": self.username, "datasetSlug": slug}
+        exists = self.request("GET", "datasets/status", params=params)
+        if exists.status_code == requests.codes.OK:
+            endpoint = f"datasets/create/version/{self.username}/{slug}"
+            request = {"versionNotes": notes, "files": tokens}
+        else:
+            endpoint = "datasets/create/new"
+            request = {
+                "ownerSlug": self.username,
+                "slug": slug,
+                "title": title or slug,
+                "licenseName": "CC0-1.0",
+                "isPrivate": False,
+                "files": tokens,
+            }
+
+        return self._json("POST", endpoint, json=request)
+
+    # endregion
+
+
+def credentials(config_dir: Path) -> tuple:
+    """Reads the API credentials, preferring the environment over `kaggle.json`."""
+    if "KAGGLE_USERNAME" in os.environ and "KAGGLE_KEY" in os.environ:
+        return os.environ["KAGGLE_USERNAME"], os.environ["KAGGLE_KEY"]
+
+    config = json.load(open(Path(config_dir) / "kaggle.json", "r"))
+    return config["username"], config["key"]
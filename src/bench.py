@@ -0,0 +1,458 @@
+"""Benchmarks `group.validate_syllabus`, `group.touch`, `meeting.touch`, and
+`meeting.publish` on synthetic semesters, e.g.
+
+    inv bench.run --meetings 150 --cells 40 --image-kb 64 --output bench.json
+    inv bench.compare bench.json --baseline baseline.json
+
+Every repetition builds a throwaway workspace: a Group, its `syllabus.yml`,
+SolutionBooks (with `cells` cells and `images` embedded images of `image-kb` KiB each),
+and a bare-bones site. Nothing leaves the machine: link checks and Kaggle's API are
+answered by an `http.server` on localhost, the term's calendar is synthetic, and
+archetypes are rendered natively (so Docker's never needed). Each task is timed end to
+end and by stage (as marked by `status.begin`).
+"""
+import os
+import json
+import time
+import base64
+import shutil
+import platform
+import threading
+from io import StringIO
+from pathlib import Path
+from contextlib import redirect_stdout
+from urllib.parse import urlsplit
+
+from invoke import task, Context
+
+from .tools import status
+
+TASKS = ["group.validate_syllabus", "group.touch", "meeting.touch", "meeting.publish"]
+
+GROUP, SEMESTER = "bench", "fa20"
+
+# region Local stand-ins
+ARCHETYPES = {
+    "author/_index.md": (
+        '---\ntitle: "{{ replace .Name "-" " " | title }}"\nuser_groups: []\n'
+        "ucfai:\n  teams: []\n  roles: []\n---\n"
+    ),
+    "semester/_index.md": (
+        '---\ntitle: "{{ .Name }}"\ndate: {{ .Date }}\nfrequency: 1\n'
+        'location: ""\n---\n'
+    ),
+    "group-meeting.md": (
+        '---\ntitle: "{{ .Name }}"\nlinktitle: ""\ndate: {{ .Date }}\nweight: 1\n'
+        'authors: []\nurls:\n  youtube: ""\n  slides: ""\n  github: ""\n  kaggle: ""\n'
+        '  colab: ""\nlocation: ""\ntags: []\nabstract: ""\n---\n'
+    ),
+}
+
+OFFICERS = [
+    "President",
+    "Vice President",
+    "Director",
+    "Coordinator",
+    "Guest",
+    "Advisor",
+]
+
+
+def _serve():
+    import http.server
+
+    class StandIn(http.server.BaseHTTPRequestHandler):
+        """Resolves every link, and plays Kaggle's API under `/kaggle`."""
+
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real hosts
+
+        def _reply(self, code: int, body: bytes = b""):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"bench"')
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_HEAD(self):
+            self._reply(200)
+
+        def do_GET(self):
+            # no Kernel has been pushed before, so every push goes through
+            if self.path.startswith("/kaggle/kernels/pull"):
+                return self._reply(404, b"{}")
+            self._reply(200)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._reply(200, json.dumps({"ref": "", "url": "", "error": ""}).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def _stand_in_adapter(base: str, workers: int):
+    from requests.adapters import HTTPAdapter
+
+    class StandInAdapter(HTTPAdapter):
+        """Sends every request to `base`, keeping the original host in the path."""
+
+        def send(self, request, **kwargs):
+            url = urlsplit(request.url)
+            query = f"?{url.query}" if url.query else ""
+            request.url = f"{base}/{url.netloc}{url.path}{query}"
+            return super().send(request, **kwargs)
+
+    return StandInAdapter(pool_connections=workers, pool_maxsize=workers)
+
+
+def _stand_in(ctx, base: str):
+    """Points link checks and Kaggle's API at the stand-in server."""
+    from . import load_config
+    from .tools import urls
+
+    config = load_config()
+    config["kaggle"]["api_url"] = f"{base}/kaggle"
+    config["kaggle"]["rate"] = 0  # the stand-in doesn't need rate-limiting
+    os.environ["KAGGLE_USERNAME"] = config["kaggle"]["username"]
+    os.environ["KAGGLE_KEY"] = "bench"
+
+    ctx["settings"] = config
+    adapter = _stand_in_adapter(base, config["links"]["workers"])
+    urls._get_session(ctx).mount("https://", adapter)
+
+
+# endregion
+
+# region Synthetic semesters
+def _title(idx: int) -> str:
+    return f"Synthetic {idx:03d}"
+
+
+def _make_site(root: Path, repo: str):
+    site = root / repo
+    for path, text in ARCHETYPES.items():
+        (site / "archetypes" / path).parent.mkdir(parents=True, exist_ok=True)
+        (site / "archetypes" / path).write_text(text)
+
+    (site / "content" / "authors").mkdir(parents=True)
+    (site / "content" / "groups" / GROUP).mkdir(parents=True)
+    (site / "data").mkdir()
+    (site / "data" / "config.yml").write_text(f"officers: {json.dumps(OFFICERS)}\n")
+
+
+def _make_calendar(root: Path, meetings: int):
+    """Stores a synthetic term, long enough for every Meeting, in the workspace.
+
+    Otherwise `cal.load_index` would download the term from UCF's calendar.
+    """
+    import pandas as pd
+
+    from .tools import cal
+
+    begin = pd.Timestamp("2020-08-24")
+    # the Group starts a week in, and Labor Day takes another week
+    end = begin + pd.Timedelta(weeks=meetings + 2)
+    events = [
+        {"summary": "Classes Begin", "start": "2020-08-24", "end": "2020-08-24"},
+        {"summary": "Labor Day", "start": "2020-09-07", "end": "2020-09-07"},
+        {"summary": "Classes End", "start": str(end.date()), "end": str(end.date())},
+    ]
+
+    cal.CALENDAR_STORE = root / "calendars"
+    cal.store(SEMESTER, events)
+
+
+def _make_semester(root: Path, meetings: int, kaggle: bool):
+    import pandas as pd
+
+    from . import yaml
+    from .concepts import Group, Meeting
+
+    path = root / GROUP / SEMESTER
+    path.mkdir(parents=True)
+
+    group = Group(
+        required={
+            "name": GROUP,
+            "semester": SEMESTER,
+            "frequency": 1,
+            "startdate": str(pd.Timestamp("2020-08-31")),
+            "directors": ["director-0"],
+            "coordinators": [f"coordinator-{idx}" for idx in range(4)],
+            "room": "HEC 101",
+        },
+        optional={"use-notebooks": True},
+    )
+    yaml.dump(group, open(path / "group.yml", "w"))
+
+    syllabus = [
+        Meeting(
+            required={
+                "id": f"bench{idx:04d}",
+                "title": _title(idx),
+                "filename": f"synthetic-{idx:03d}",
+                "authors": [f"coordinator-{idx % 4}"],
+            },
+            optional={"kaggle": True} if kaggle else {},
+        )
+        for idx in range(meetings)
+    ]
+    yaml.dump(syllabus, open(path / "syllabus.yml", "w"))
+
+
+def _solutionbook(cells: int, images: int, image_kb: int) -> str:
+    import nbformat as nbf
+
+    # a PNG signature is enough for anything that sniffs the data
+    image = b"\x89PNG\r\n\x1a\n" + os.urandom(image_kb * 1024)
+    image = base64.b64encode(image).decode("ascii")
+
+    nb = nbf.v4.new_notebook()
+    for idx in range(cells):
+        if idx % 2 == 0:
+            nb.cells.append(nbf.v4.new_markdown_cell(f"## Step {idx}\nSome prose."))
+            continue
+
+        source = (
+            f"x = {idx}\n### BEGIN SOLUTION\ny = x ** 2\n### END SOLUTION\nprint(y)"
+        )
+        cell = nbf.v4.new_code_cell(source, execution_count=idx)
+        cell.outputs.append(nbf.v4.new_output("stream", text=f"{idx ** 2}\n"))
+        if idx // 2 < images:
+            cell.outputs.append(
+                nbf.v4.new_output("display_data", data={"image/png": image})
+            )
+        nb.cells.append(cell)
+
+    return nbf.writes(nb)
+
+
+def _add_solutionbooks(root: Path, suffix: str, cells: int, images: int, image_kb: int):
+    from .tools import layout
+
+    path = root / GROUP / SEMESTER
+    text = _solutionbook(cells, images, image_kb)
+    for entry in layout.load(path).values():
+        name = entry["dir"][6:]  # strip the date
+        (path / entry["dir"] / f"{name}{suffix}").write_text(text)
+
+
+# endregion
+
+# region Timing
+class _Stages:
+    """Tallies the time between consecutive `status.begin`s, by stage.
+
+    Stages named after a synthetic Meeting are tallied together, as `<meeting>`.
+    """
+
+    def __init__(self, titles: set):
+        self.titles = titles
+        self.times = {}
+        self.name = "(load)"
+        self.start = time.perf_counter()
+
+    def __call__(self, kind: str, msg: str):
+        if kind == "begin":
+            self.close()
+            self.name = "<meeting>" if msg.strip() in self.titles else msg.strip()
+
+    def close(self):
+        now = time.perf_counter()
+        self.times[self.name] = self.times.get(self.name, 0.0) + now - self.start
+        self.start = now
+
+
+def _time(fn, titles: set, **kwargs) -> dict:
+    """Runs the task `fn` with its output captured, and times it (and its stages)."""
+    # anything reported so far mustn't end up in the task's (captured) output
+    status.flush()
+
+    stages = _Stages(titles)
+    status.observers.append(stages)
+
+    output = StringIO()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with redirect_stdout(output):
+            fn(Context(), **kwargs)
+    except BaseException:
+        print(output.getvalue())
+        raise
+    finally:
+        status.observers.remove(stages)
+
+    stages.close()
+    return {
+        "wall": time.perf_counter() - wall,
+        "cpu": time.process_time() - cpu,
+        "stages": stages.times,
+    }
+
+
+def _repetition(ctx, root: Path, opts: dict) -> dict:
+    from . import group, meeting
+
+    _make_site(root, ctx.settings.hugo.repo)
+    _make_calendar(root, opts["meetings"])
+    _make_semester(root, opts["meetings"], opts["kaggle"])
+
+    titles = {_title(idx) for idx in range(opts["meetings"])}
+    where = {"group": GROUP, "semester": SEMESTER}
+
+    results = {}
+    results["group.validate_syllabus"] = _time(group.validate_syllabus, titles, **where)
+    results["group.touch"] = _time(group.touch, titles, **where)
+
+    # SolutionBooks go into the directories `group.touch` made (this isn't timed)
+    suffix = ctx.settings.suffixes.solutionbook
+    _add_solutionbooks(root, suffix, opts["cells"], opts["images"], opts["image_kb"])
+
+    jobs = opts["jobs"]
+    results["meeting.touch"] = _time(meeting.touch, titles, jobs=jobs, **where)
+    results["meeting.publish"] = _time(meeting.publish, titles, jobs=jobs, **where)
+
+    return results
+
+
+# endregion
+
+
+@task
+def run(
+    ctx,
+    meetings=15,
+    cells=20,
+    images=2,
+    image_kb=32,
+    kaggle=True,
+    jobs=1,
+    repeat=3,
+    output="bench.json",
+    baseline="",
+    workdir="",
+    keep=False,
+):
+    """Times touch/validate/publish on a synthetic semester, and saves the results.
+
+    Stage timings are only complete with `--jobs 1`, since stages that run on a worker
+    pool aren't seen by this process.
+    """
+    opts = {
+        "meetings": int(meetings),
+        "cells": int(cells),
+        "images": int(images),
+        "image_kb": int(image_kb),
+        "kaggle": bool(kaggle),
+        "jobs": int(jobs),
+        "repeat": int(repeat),
+    }
+    output = Path(output).absolute()
+
+    meetings, repeat = opts["meetings"], opts["repeat"]
+    status.heading(f"Benchmarking {meetings} Meeting(s), {repeat} time(s)")
+
+    import tempfile
+
+    from .tools import cal
+
+    server = _serve()
+    _stand_in(ctx, f"http://127.0.0.1:{server.server_port}")
+    # each repetition stores its own (synthetic) calendar, see `_make_calendar`
+    calendars = cal.CALENDAR_STORE
+
+    # tasks resolve the Group, and the site, relative to the working directory
+    os.environ.pop("GITHUB_ACTIONS", None)
+    pwd = os.getcwd()
+
+    results = {name: {"wall": [], "cpu": [], "stages": {}} for name in TASKS}
+    try:
+        for rep in range(opts["repeat"]):
+            root = Path(tempfile.mkdtemp(prefix="autobot-bench-", dir=workdir or None))
+            os.chdir(root)
+            try:
+                timings = _repetition(ctx, root, opts)
+            finally:
+                os.chdir(pwd)
+                if not keep:
+                    shutil.rmtree(root)
+
+            status.begin(f"Repetition {rep + 1}")
+            for name, timing in timings.items():
+                results[name]["wall"].append(timing["wall"])
+                results[name]["cpu"].append(timing["cpu"])
+                for stage, seconds in timing["stages"].items():
+                    results[name]["stages"].setdefault(stage, []).append(seconds)
+                status.success(f"`{name}` took {timing['wall']:.2f}s.")
+            status.flush()
+    finally:
+        server.shutdown()
+        cal.CALENDAR_STORE = calendars
+        cal.load_index.cache_clear()
+
+    report = {
+        "options": opts,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tasks": results,
+    }
+    json.dump(report, open(output, "w"), indent=2)
+    status.success(f"Saved results to `{output}`.", prefix="")
+
+    if baseline:
+        compare(ctx, str(output), baseline=baseline)
+
+
+@task
+def compare(ctx, results, baseline="", threshold=0.1, min_seconds=0.05):
+    """Compares (median) timings in `results` against a `baseline`, by task and stage.
+
+    Anything more than `threshold` (as a fraction) slower than the baseline counts as a
+    regression; stages shorter than `min_seconds` in the baseline are too noisy to
+    compare. Exits with an error if anything regressed.
+    """
+    import statistics
+
+    current = json.load(open(results, "r"))
+    previous = json.load(open(baseline, "r"))
+    threshold, min_seconds = float(threshold), float(min_seconds)
+
+    status.heading(f"Comparing `{results}` against `{baseline}`")
+    if current["options"] != previous["options"]:
+        status.warn("Results were generated with different options than the baseline.")
+
+    def _check(label, now, then) -> bool:
+        now, then = statistics.median(now), statistics.median(then)
+        change = (now - then) / then if then else 0.0
+        message = f"{label}: {now:.3f}s vs. {then:.3f}s ({change:+.1%})."
+        if change > threshold:
+            status.fail(message)
+            return False
+
+        status.success(message)
+        return True
+
+    regressions = 0
+    for name in TASKS:
+        if name not in current["tasks"] or name not in previous["tasks"]:
+            continue
+
+        now, then = current["tasks"][name], previous["tasks"][name]
+        status.begin(name)
+        regressions += not _check("Total", now["wall"], then["wall"])
+
+        for stage, seconds in then["stages"].items():
+            if stage not in now["stages"] or statistics.median(seconds) < min_seconds:
+                continue
+            regressions += not _check(f"`{stage}`", now["stages"][stage], seconds)
+
+    status.test(regressions == 0, f"Found {regressions} regression(s).")
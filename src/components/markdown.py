@@ -32,4 +32,5 @@ def make_post(ctx: Context, query, **kwargs):
     md = open(path, "r").read()
 
     weight = kwargs.get("weight", -1)
-    website.touch_meeting(ctx, m, body=md, weight=weight)
+    links = kwargs.get("links", None)
+    return website.touch_meeting(ctx, m, body=md, weight=weight, links=links)
@@ -19,30 +19,36 @@ from nbgrader.preprocessors import ClearOutput, ClearSolutions
 
 from .. import j2env, read_from_disk
 from ..meeting import search
+from ..tools import trace
 from . import website
 
 
 def make_solutionbook(ctx, query, **kwargs):
     """Ensures that all Solutionbooks have accurate headings, pathing, and metadata.
+
+    The standardized Notebook is only written if it differs from what's on disk, so
+    already-standard Solutionbooks keep their mtime.
+
+    :returns: whether the Solutionbook was (re)written
     """
     m = search(ctx, query)
 
     _solnbook = ctx.settings.suffixes.solutionbook
 
-    standard = NotebookExporter()
-    standard.register_preprocessor(
-        TagRemovePreprocessor(remove_cell_tags=["template"]), enabled=True
-    )
-
     setattr(m, "group", ctx.group)
     path = ctx.path / str(m) / f"{m.filename}{_solnbook}"
     # If the notebook doesn't exist, or it's empty
     if not path.exists() or path.stat().st_size == 0:
+        ondisk = ""
         nb = nbf.v4.new_notebook()
-        nbf.write(nb, open(path, "w"))
+    else:
+        ondisk = path.read_text()
+        nb = nbf.reads(ondisk, as_version=4)
 
-    nb, _ = standard.from_filename(str(path))
-    nb = nbf.reads(nb, as_version=4)
+    # Strip previously injected cells; this is all a `NotebookExporter` with this
+    #   preprocessor would do, minus the round-trip through nbconvert
+    standard = TagRemovePreprocessor(remove_cell_tags=["template"])
+    nb, _ = standard.preprocess(nb, {})
 
     # Inject Heading
     html_header = j2env.get_template("notebooks/header.html.j2")
@@ -66,7 +72,21 @@ def make_solutionbook(ctx, query, **kwargs):
     metadata = nb_metadata.render(meeting=m)
     nb.metadata.update(json.loads(metadata))
 
-    nbf.write(nb, open(path, "w"))
+    # Newer `nbformat`s give new cells random ids, which would never compare equal
+    for cell, id in zip(nb.cells, ["autobot-header", "autobot-dataset"]):
+        if "id" in cell:
+            cell["id"] = id
+
+    # `nbf.write` always ends the file with a newline
+    standardized = nbf.writes(nb)
+    if not standardized.endswith("\n"):
+        standardized += "\n"
+
+    if standardized == ondisk:
+        return False
+
+    path.write_text(standardized)
+    return True
 
 
 def make_workbook(ctx, query, **kwargs):
@@ -94,10 +114,12 @@ def make_workbook(ctx, query, **kwargs):
     try:
         path = ctx.path / str(m) / m.filename
 
-        nb, _ = workbook.from_filename(str(path.with_suffix(_solnbook)))
+        with trace.span("nbconvert"):
+            nb, _ = workbook.from_filename(str(path.with_suffix(_solnbook)))
         nb = nbf.reads(nb, as_version=4)
 
         nbf.write(nb, open(path.with_suffix(_workbook), "w"))
+        return path.with_suffix(_workbook)
     except Exception:
         raise Exception(f"Workbook export failed on `{m}`.")
 
@@ -122,11 +144,13 @@ def make_post(ctx, query, **kwargs):
     # lastmod = pd.Timestamp(name.stat().st_mtime, unit="s")
     # setattr(m, "lastmod", lastmod)
 
-    nb, _ = as_post.from_filename(str(name))
+    with trace.span("nbconvert"):
+        nb, _ = as_post.from_filename(str(name))
 
     weight = kwargs.get("weight", -1)
+    links = kwargs.get("links", None)
     try:
-        website.touch_meeting(ctx, m, body=nb, weight=weight)
+        return website.touch_meeting(ctx, m, body=nb, weight=weight, links=links)
     except:
         raise
         pdb.set_trace()
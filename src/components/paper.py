@@ -1,22 +1,134 @@
+import os
+import json
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from invoke import task
 
 from ..concepts import Meeting
 from ..tools import status
 
+CHUNK = 1 << 16
 
-def download(ctx, m: Meeting):
-    """Downloads papers and names them based on keys for meetings.
+
+def _is_pdf(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(5) == b"%PDF-"
+    except FileNotFoundError:
+        return False
+
+
+def _validator(res) -> str:
+    """What `If-Range` can use to tell whether `res`'s file has changed since."""
+    etag = res.headers.get("ETag", "")
+    # weak ETags can't be used with `If-Range`
+    if etag and not etag.startswith("W/"):
+        return etag
+
+    return res.headers.get("Last-Modified", "")
+
+
+def fetch(ctx, link: str, dest: Path, resume: bool = True) -> int:
+    """Streams `link` to `dest`, via a `.part` file that's renamed once it's complete.
+
+    If an earlier attempt left a `.part` file behind, the download resumes from where
+    it stopped, as long as the link and the file (by its ETag or Last-Modified, saved
+    next to the `.part` in `.part.json`) are the same. Otherwise, or when the server
+    won't resume it, the download starts over.
+
+    :returns: number of bytes transferred
     """
+    part = dest.with_name(f"{dest.name}.part")
+    meta = dest.with_name(f"{dest.name}.part.json")
+
+    headers = {}
+    try:
+        saved = json.load(open(meta, "r"))
+        if resume and part.exists() and saved["link"] == link and saved["validator"]:
+            headers["Range"] = f"bytes={part.stat().st_size}-"
+            headers["If-Range"] = saved["validator"]
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+
+    timeout = ctx.settings.papers.timeout
+    with requests.get(link, headers=headers, stream=True, timeout=timeout) as res:
+        # e.g. the `.part` was already complete, but never renamed
+        restart = headers and res.status_code == requests.codes.RANGE_NOT_SATISFIABLE
+        if not restart:
+            res.raise_for_status()
+
+            # servers without `Range` support (or whose file changed, see `If-Range`)
+            #   send the whole file again
+            transferred = 0
+            if res.status_code == requests.codes.PARTIAL_CONTENT:
+                mode = "ab"
+            else:
+                mode = "wb"
+                json.dump({"link": link, "validator": _validator(res)}, open(meta, "w"))
+
+            with open(part, mode) as f:
+                for chunk in res.iter_content(chunk_size=CHUNK):
+                    f.write(chunk)
+                    transferred += len(chunk)
 
-    folder = ctx.path / str(m)
+    if restart:
+        part.unlink()
+        return fetch(ctx, link, dest, resume=False)
 
-    for title, link in m.papers.items():
-        prefix = "  1. "
+    if not _is_pdf(part):
+        part.unlink()
+        meta.unlink()
+        raise ValueError(f"`{link}` didn't return a PDF.")
+
+    os.replace(part, dest)
+    meta.unlink()
+    return transferred
+
+
+def download_all(ctx, meetings: list):
+    """Downloads the papers of all `meetings` concurrently, naming them by their keys.
+
+    Papers that were already downloaded (and look like PDFs) are skipped.
+    """
+    papers = [
+        (title, link, ctx.path / str(m) / f"{title}.pdf")
+        for m in meetings
+        for title, link in m.papers.items()
+    ]
+
+    def _download(paper):
+        title, link, dest = paper
+        if _is_pdf(dest):
+            return None
+
+        start = time.perf_counter()
         try:
-            with open(folder / f"{title}.pdf", "wb") as pdf:
-                pdf.write(requests.get(link).content)
-            # TODO Check for corruptness / PDF headers
-            status.success(f"Successfully downloaded `{title}`.", prefix=prefix)
-        except ConnectionError:
-            status.fail(f"Unable to access link for `{title}`.", prefix=prefix)
+            return fetch(ctx, link, dest), time.perf_counter() - start
+        except (requests.RequestException, ValueError) as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=ctx.settings.papers.workers) as pool:
+        results = list(pool.map(_download, papers))
+
+    prefix = "  1. "
+    for (title, _, _), result in zip(papers, results):
+        if result is None:
+            status.success(f"Already downloaded `{title}`.", prefix=prefix)
+        elif isinstance(result, Exception):
+            status.fail(f"Unable to download `{title}`: {result}", prefix=prefix)
+        else:
+            size, seconds = result
+            status.success(
+                f"Successfully downloaded `{title}` "
+                f"({size / 1024:.0f} KiB in {seconds:.1f}s).",
+                prefix=prefix,
+            )
+
+
+def download(ctx, m: Meeting):
+    """Downloads papers and names them based on keys for meetings.
+    """
+    download_all(ctx, [m])
@@ -10,6 +10,10 @@ def load_config(key: str = ""):
     return hugo.load_data("config.yml", key=key)
 
 
+def officer_ranks():
+    return hugo.officer_ranks()
+
+
 def cleanup_authors(ctx):
     pass
 
@@ -18,6 +22,10 @@ def touch_author(ctx, author):
     hugo.touch_author(ctx, author)
 
 
+def reconcile_authors(ctx):
+    return hugo.reconcile_authors(ctx)
+
+
 def touch_group(ctx):
     hugo.touch_group(ctx)
 
@@ -39,13 +47,15 @@ def touch_meeting(ctx: Context, m: Meeting, body: str, weight: int = -1, **kwarg
 
     editor.fm["authors"] = m.authors
 
-    from ..tools import urls
+    # Links are best resolved for the whole semester at once, see `urls.resolve`
+    links = kwargs.get("links", None)
+    if links is None:
+        from ..tools import urls
+
+        links = urls.resolve(ctx, [m])[m.id]
 
-    editor.fm["urls"]["youtube"] = urls.youtube(ctx, m)
-    editor.fm["urls"]["slides"] = urls.slides(ctx, m)
-    editor.fm["urls"]["github"] = urls.github(ctx, m)
-    editor.fm["urls"]["kaggle"] = urls.kaggle(ctx, m)
-    editor.fm["urls"]["colab"] = urls.colab(ctx, m)
+    for kind, url in links.items():
+        editor.fm["urls"][kind] = url
 
     editor.fm["location"] = m.room
     # editor.fm["cover"] = m.cover_image
@@ -81,3 +91,5 @@ def touch_meeting(ctx: Context, m: Meeting, body: str, weight: int = -1, **kwarg
         pass
 
     editor.dump()
+
+    return editor.path
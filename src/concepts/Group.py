@@ -48,6 +48,8 @@ class Group:
             self.optional["use-kaggle"] = optional["use-kaggle"]
         if "use-notebooks" in optional:
             self.optional["use-notebooks"] = optional["use-notebooks"]
+        if "holidays" in optional:
+            self.optional["holidays"] = optional["holidays"]
         if "pull-papers" in optional:
             self.optional["use-papers"] = optional["use-papers"]
 
@@ -107,6 +107,11 @@ class Meeting:
         with open(path / ".metadata", "w") as f:
             f.write(self.id)
 
+        from ..tools import layout
+
+        with layout.transaction(parent) as meetings:
+            meetings[self.id] = {"dir": path.name}
+
     @staticmethod
     def placeholder(ctx: Context, m: str, date: pd.Timestamp, **kwargs):
         required = dict(
@@ -0,0 +1,148 @@
+import re
+import difflib
+from bisect import bisect_left, bisect_right
+from typing import List
+
+import pandas as pd
+
+from .Meeting import Meeting
+
+
+class UnknownMeeting(LookupError):
+    pass
+
+
+class AmbiguousQuery(LookupError):
+    pass
+
+
+_DATE = re.compile(r"^(\d{4}-)?\d{2}-\d{2}$")
+
+
+class Syllabus(list):
+    """A semester's (flattened) Meetings, indexed for lookups.
+
+    Meetings can be looked up exactly by id, filename, directory name
+    (`MM-DD-filename`), or date (`YYYY-MM-DD` or `MM-DD`); failing that, by a unique
+    prefix or substring of their filename, and finally by the closest filename. The
+    index is built once, so it won't notice Meetings that are added (or edited)
+    afterwards.
+    """
+
+    def __init__(self, meetings: List[Meeting] = []):
+        super().__init__(meetings)
+
+        self._exact = {}
+        for m in self:
+            for key in [m.id, m.filename, repr(m)]:
+                self._exact.setdefault(str(key).lower(), m)
+
+        dated = sorted((m for m in self if not pd.isnull(m.date)), key=lambda m: m.date)
+        # Meetings may have a time of day, but they're looked up by the day
+        self._dates = [m.date.normalize() for m in dated]
+        self._by_date = dated
+
+        named = sorted(self, key=lambda m: m.filename.lower())
+        self._names = [m.filename.lower() for m in named]
+        self._by_name = named
+
+    # region Lookups
+    def on(self, date) -> List[Meeting]:
+        """Meetings on `date`; `MM-DD` dates match in any year."""
+        if isinstance(date, str) and len(date) == 5:
+            return [m for m in self._by_date if repr(m).startswith(date)]
+
+        return self.between(date, date)
+
+    def between(self, start, end) -> List[Meeting]:
+        """Meetings on the days `start` through `end` (either may be left empty).
+
+        `MM-DD` days are taken to be in the syllabus' year.
+        """
+        n = len(self._dates)
+        lo = bisect_left(self._dates, self._day(start)) if str(start).strip() else 0
+        hi = bisect_right(self._dates, self._day(end)) if str(end).strip() else n
+
+        return self._by_date[lo:hi]
+
+    def _day(self, value) -> pd.Timestamp:
+        text = str(value).strip()
+        if len(text) == 5 and self._dates:
+            text = f"{self._dates[0].year}-{text}"
+
+        try:
+            day = pd.Timestamp(text)
+        except (ValueError, OverflowError):
+            day = pd.NaT
+        if pd.isnull(day):
+            raise UnknownMeeting(f"`{value}` isn't a date.")
+
+        return day.normalize()
+
+    def prefixed(self, prefix: str) -> List[Meeting]:
+        prefix = prefix.lower()
+        lo = bisect_left(self._names, prefix)
+        hi = bisect_left(self._names, prefix + "\uffff")
+
+        return self._by_name[lo:hi]
+
+    def get(self, query: str) -> Meeting:
+        """Finds the one Meeting `query` refers to.
+
+        :raises UnknownMeeting: if nothing matches
+        :raises AmbiguousQuery: if several Meetings match equally well
+        """
+        query = query.strip()
+        key = query.lower()
+        if key in self._exact:
+            return self._exact[key]
+
+        if _DATE.match(query):
+            return self._one(query, self.on(query))
+
+        matches = self.prefixed(key)
+        if not matches:
+            matches = [m for m in self if key in m.filename.lower()]
+        if matches:
+            return self._one(query, matches)
+
+        # the closest filename(s), if they're close enough
+        scores = {}
+        for m, name in zip(self._by_name, self._names):
+            score = difflib.SequenceMatcher(None, key, name).ratio()
+            if score >= 0.6:
+                scores.setdefault(score, []).append(m)
+
+        if not scores:
+            raise UnknownMeeting(f"No Meeting matches `{query}`.")
+
+        return self._one(query, scores[max(scores)])
+
+    def find(self, query: str) -> List[Meeting]:
+        """Finds every Meeting in `query`, in syllabus order.
+
+        `query` is a comma-separated list of anything `get` takes, or of date ranges
+        (`START..END`, where either end may be left open).
+        """
+        found = {}
+        for part in filter(None, (x.strip() for x in query.split(","))):
+            if ".." in part:
+                start, end = part.split("..", maxsplit=1)
+                found.update((m.id, m) for m in self.between(start, end))
+            else:
+                m = self.get(part)
+                found[m.id] = m
+
+        return [m for m in self if m.id in found]
+
+    @staticmethod
+    def _one(query: str, matches: List[Meeting]) -> Meeting:
+        if len(matches) > 1:
+            names = ", ".join(f"`{m!r}`" for m in matches)
+            raise AmbiguousQuery(f"`{query}` could be any of: {names}.")
+        if not matches:
+            raise UnknownMeeting(f"No Meeting matches `{query}`.")
+
+        return matches[0]
+
+    # endregion
@@ -1,9 +1,10 @@
 from .Coordinator import Coordinator
 from .Group import Group
 from .Meeting import Meeting
+from .Syllabus import Syllabus
 
 __all__ = [
-    # "Syllabus",
+    "Syllabus",
     "Group",
     "Meeting",
     "Coordinator",
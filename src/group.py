@@ -3,12 +3,10 @@ import shutil
 from pathlib import Path
 
 from invoke import task
-import pandas as pd
 
-from . import yaml, j2env, read_from_disk, read_and_flatten
-from .concepts import Group, Meeting
-from .tools import status, cal
-from .components import website
+from . import read_from_disk, read_and_flatten
+from .tools import status, layout, yamlcache
+from .tools.trace import Traced
 
 
 @task
@@ -19,13 +17,17 @@ def new_group(ctx, group):
     raise NotImplementedError()
 
 
-@task
-def add_semester(ctx, group="", semester=""):
+@task(klass=Traced)
+def add_semester(ctx, group="", semester="", calendar=""):
+    from . import yaml, j2env
+    from .concepts import Meeting
+    from .tools import cal
+
     if "semester" in ctx:
         del ctx["semester"]
 
-    ctx = read_from_disk(ctx, group, semester)
-    print(f"# Adding `{ctx.group.semester}` to `{ctx.group.name.capitalize()}`")
+    ctx = read_from_disk(ctx, group, semester, roundtrip=True)
+    status.heading(f"Adding `{ctx.group.semester}` to `{ctx.group.name.capitalize()}`")
 
     ctx.path.mkdir()
 
@@ -35,6 +37,10 @@ def add_semester(ctx, group="", semester=""):
     inv = inv.render(group=ctx.group.name, semester=ctx.group.semester)
     inv = yaml.load(inv)
 
+    # Use a local (JSON or ICS) calendar for this semester, instead of UCF's
+    if calendar:
+        cal.import_calendar(calendar, ctx.group.semester)
+
     schedule = cal.temp_schedule(ctx.group)
     ctx.group.startdate = schedule[0]
 
@@ -47,7 +53,7 @@ def add_semester(ctx, group="", semester=""):
     }
 
     for filepath, contents in files_to_write.items():
-        yaml.dump(contents, open(filepath, "w"))
+        yamlcache.dump(contents, filepath)
         status.success(f"Wrote `{filepath}`.")
     # endregion
 
@@ -63,17 +69,19 @@ def add_semester(ctx, group="", semester=""):
         for idx, date in enumerate(schedule)
     ]
     status.success(f"Created `{ctx.path / 'syllabus.yml'}`.")
-    yaml.dump(meetings, ctx.path / "syllabus.yml")
+    yamlcache.dump(meetings, ctx.path / "syllabus.yml")
     # endregion
 
     exit(0)  # Enforce a prompt exit
 
 
-@task
+@task(klass=Traced)
 def validate_syllabus(ctx, group="", semester=""):
     """Reads necessary configuration files to act over a semester."""
-    ctx = read_from_disk(ctx, group, semester)
-    print(f"# Validating Syllabus for `{ctx.group.name.capitalize()}`")
+    from .tools import cal
+
+    ctx = read_from_disk(ctx, group, semester, roundtrip=True)
+    status.heading(f"Validating Syllabus for `{ctx.group.name.capitalize()}`")
 
     # TODO validate dates follow the meeting pattern and ping Discord if not
 
@@ -87,20 +95,22 @@ def validate_syllabus(ctx, group="", semester=""):
     # region Set defaults if no value is set
     if empty:
         status.begin("Setting Defaults for New Semester")
+        # Set meeting dates based on the frequency (and around holidays)
+        schedule = cal.make_schedule(ctx.group)
         for idx, m in enumerate(ctx.syllabus):
-            status.begin(m.required["title"], prefix="### ")
-            # Set meeting dates based on the frequency
-            # TODO check that meetings aren't during holidays
-            delta = pd.Timedelta(days=7 * idx * ctx.group.required["frequency"])
-            m.required["date"] = ctx.group.required["startdate"] + delta
-            status.success(f"Set default date: {m.required['date']}.")
+            status.begin(m.required["title"], prefix="### ", meeting=str(m))
+            if idx < len(schedule):
+                m.required["date"] = schedule[idx]
+                status.success(f"Set default date: {m.required['date']}.")
+            else:
+                status.warn("The semester's schedule has no dates left.")
 
             if not m.required["room"]:
                 m.required["room"] = ctx.group.room
                 status.success(f"Set default room: {m.required['room']}.")
 
     status.success("Successfully set defaults in `syllabus.yml`.", prefix="")
-    yaml.dump(ctx.syllabus, ctx.path / "syllabus.yml")
+    yamlcache.dump(ctx.syllabus, ctx.path / "syllabus.yml")
     # endregion
 
     shouldfail = 0
@@ -113,14 +123,18 @@ def validate_syllabus(ctx, group="", semester=""):
         if m.required["authors"] and len(missing) > 0:
             status.warn(
                 f"`{m.required['title']}`: Could not find `{missing}` in Group's "
-                f"authors. Please add them."
+                f"authors. Please add them.",
+                tag="missing-authors",
             )
             shouldfail += 1
         elif not m.required["authors"]:
-            status.warn(f"`{m.required['title']}` has no authors. Please add them.")
+            status.warn(
+                f"`{m.required['title']}` has no authors. Please add them.",
+                tag="missing-authors",
+            )
             shouldfail += 1
         elif not authors:
-            status.warn(f"Group has no authors. Please add them.")
+            status.warn("Group has no authors. Please add them.", tag="missing-authors")
             shouldfail += 1
     # endregion
 
@@ -137,47 +151,55 @@ def validate_syllabus(ctx, group="", semester=""):
     )
 
     sorted_syllabus = sorted(ctx.syllabus, key=lambda x: x.required["date"])
-    yaml.dump(sorted_syllabus, ctx.path / "syllabus.yml")
+    yamlcache.dump(sorted_syllabus, ctx.path / "syllabus.yml")
     status.success("Re-ordered syllabus.")
     # endregion
 
 
-@task
+@task(klass=Traced)
 def touch(ctx, group="", semester=""):
     """Mimics Unix `touch` and creates/updates a Semester for a Group."""
+    from .components import website
+
     ctx = read_and_flatten(ctx, group=group, semester=semester)
-    print(f"# Touching `{ctx.group.name.capitalize()}`")
+    status.heading(f"Touching `{ctx.group.name.capitalize()}`")
 
     # region Create / Rename Folders
     status.begin("Touch Meeting Directories")
     syllabus = {m.id: ctx.path / str(m) for m in ctx.syllabus}
-    ondisk = sorted([x for x in ctx.path.glob("??-??-*/") if x.is_dir()])
-    ondisk = {open(p / ".metadata", "r").read(): p for p in ondisk}
-
-    created = 0
-    for sha, meeting in syllabus.items():
-        try:
-            ondisk[sha].rename(meeting)
-        except (FileNotFoundError, KeyError):
-            meeting.mkdir()
-            open(meeting / ".metadata", "w").write(sha)
-            created += 1
-            ondisk[sha] = meeting
-
-    mode = "Created" if created / len(syllabus) > 0.5 else "Updated"
-    status.success(f"{mode} Meeting directories.")
-    # endregion
-
-    # region Rename matching folder contents
-    status.begin("Match Necessary Contents to Directory Name")
-    for sha, meeting in syllabus.items():
-        prv_name = ondisk[sha].stem[6:]  # only look at filenames
-        new_name = meeting.stem[6:]  # only look at filenames
 
-        for child in meeting.iterdir():
-            if child.stem.startswith(prv_name):
-                ext = "".join(child.suffixes)
-                child.rename(child.parent / f"{new_name}{ext}")
+    with layout.transaction(ctx.path) as meetings:
+        ondisk = {sha: ctx.path / entry["dir"] for sha, entry in meetings.items()}
+
+        created = 0
+        for sha, meeting in syllabus.items():
+            try:
+                ondisk[sha].rename(meeting)
+            except (FileNotFoundError, KeyError):
+                meeting.mkdir(exist_ok=True)
+                open(meeting / ".metadata", "w").write(sha)
+                created += 1
+                ondisk[sha] = meeting
+                meetings[sha] = {"dir": meeting.name}
+
+        mode = "Created" if created / len(syllabus) > 0.5 else "Updated"
+        status.success(f"{mode} Meeting directories.")
+        # endregion
+
+        # region Rename matching folder contents
+        status.begin("Match Necessary Contents to Directory Name")
+        for sha, meeting in syllabus.items():
+            prv_name = ondisk[sha].stem[6:]  # only look at filenames
+            new_name = meeting.stem[6:]  # only look at filenames
+
+            # Only renamed Meetings need their contents looked at
+            if prv_name != new_name:
+                for child in meeting.iterdir():
+                    if child.stem.startswith(prv_name):
+                        ext = "".join(child.suffixes)
+                        child.rename(child.parent / f"{new_name}{ext}")
+
+            meetings[sha]["dir"] = meeting.name
     # endregion
 
     # region Update authorship on the website
@@ -188,34 +210,28 @@ def touch(ctx, group="", semester=""):
     # region Update authorship on the website
     status.begin(f"Touch Authors Contributing to `{ctx.group.name.capitalize()}`")
 
-    for author in ctx.group.authors():
-        try:
-            website.touch_author(ctx, author.lower())
-            status.success(f"Updated `{author.lower()}`.")
-        except:
-            status.fail(f"Failed to update `{author.lower()}`.")
-            raise
+    try:
+        written, looked_at = website.reconcile_authors(ctx)
+        status.success(f"Updated {written} of {looked_at} author page(s).")
+    except:
+        status.fail("Failed to update author pages.")
+        raise
     # endregion
 
 
-@task
+@task(klass=Traced)
 def cleanup(ctx, group="", semester=""):
     """Keeps the Group tidy with proper naming and the like."""
     ctx = read_and_flatten(ctx, group=group, semester=semester)
-    print(f"# Cleaning up `{ctx.group.name.capitalize()}`")
+    status.heading(f"Cleaning up `{ctx.group.name.capitalize()}`")
 
     # region Cleanup dangling Meeting directories
     status.begin("Clean-up Dangling Meeting Directories")
     syllabus = {m.id: ctx.path / str(m) for m in ctx.syllabus}
 
-    ondisk = sorted([x for x in ctx.path.glob("??-??-*/") if x.is_dir()])
-    ondisk = {open(p / ".metadata", "r").read(): p for p in ondisk}
-
-    ondisk_and_syllabus = set(ondisk.keys()).intersection(set(syllabus.keys()))
-
-    for sha, folder in ondisk.items():
-        if sha not in ondisk_and_syllabus:
-            shutil.rmtree(folder)
+    with layout.transaction(ctx.path) as meetings:
+        for sha in set(meetings.keys()).difference(syllabus.keys()):
+            shutil.rmtree(ctx.path / meetings.pop(sha)["dir"])
     # region
 
     # TODO Cleanup Coordinators on the website (mostly their roles)
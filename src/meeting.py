@@ -1,20 +1,13 @@
 import re
-import json
 
-from invoke import Context, task
-import nbformat as nbf
-from jinja2 import Template
-from nbconvert.exporters import MarkdownExporter, NotebookExporter
-from nbconvert.preprocessors import TagRemovePreprocessor
-from nbgrader.preprocessors import ClearOutput, ClearSolutions
+from invoke import task
 
-from . import j2env, read_and_flatten
-from .concepts import Meeting
-from .apis import kaggle
-from .tools import status
+from . import read_and_flatten
+from .tools import status, pool
+from .tools.trace import Traced
 
 
-def _has(ctx, m: Meeting, attribute):
+def _has(ctx, m: "Meeting", attribute):
     # import pdb; pdb.set_trace()
     if attribute in m.required:
         return bool(m.required[attribute])
@@ -28,120 +21,219 @@ def _has(ctx, m: Meeting, attribute):
     return False
 
 
-@task
-def touch(ctx, group="", semester="", query=""):
-    """Mimics Unix `touch` and creates/updates Meetings."""
-    from .components import notebook, markdown, paper
+def _touch(ctx, meeting):
+    """Touches a single Meeting; `touch` runs this serially or on a worker pool.
 
+    :returns: whether the Meeting's SolutionBook was rewritten (`None` if it has none)
+    """
+    from .apis import kaggle
+    from .components import notebook, markdown
+
+    status.begin(meeting.title, meeting=str(meeting))
+
+    rewritten = None
+
+    # Create SolutionBook is there's a need for it, otherwise create a SummaryFile
+    if _has(ctx, meeting, "use-notebooks"):
+        try:
+            rewritten = notebook.make_solutionbook(ctx, meeting)
+            if rewritten:
+                status.success("Successfully created SolutionBook.")
+            else:
+                status.success("SolutionBook is already standardized.")
+        except Exception:
+            status.fail("Failed to create SolutionBook.")
+            raise
+
+        try:
+            if _has(ctx, meeting, "kaggle"):
+                kaggle.kernel_metadata(ctx, meeting)
+                status.success("Created `kernel-metadata.json`.")
+        except Exception:
+            status.fail("Failed to create `kernel-metadata.json`.")
+            raise
+    else:
+        try:
+            markdown.make_summaryfile(ctx, meeting)
+            status.success("Successfully created SummaryFile.")
+        except Exception:
+            status.fail("Failed to make SummaryFile.")
+            raise
+
+    return rewritten
+
+
+@task(klass=Traced)
+def touch(ctx, group="", semester="", query="", jobs=1):
+    """Mimics Unix `touch` and creates/updates Meetings.
+
+    `--query` picks out some Meetings, e.g. `regression,2020-10-01..2020-10-31` (see
+    `Syllabus.find`).
+    """
     ctx = read_and_flatten(ctx, group=group, semester=semester)
-    print(f"# Touching `{ctx.group.name.capitalize()}` Meetings")
+    status.heading(f"Touching `{ctx.group.name.capitalize()}` Meetings")
 
     # TODO Creates / renames meeting directories (and known contents)
     if query:
-        meetings = [search(ctx, query)]
+        meetings = _index(ctx).find(query)
     else:
         meetings = ctx.syllabus
 
-    for meeting in meetings:
-        print(f"## {meeting.title}")
+    rewritten = pool.run(ctx, _touch, [(m,) for m in meetings], jobs=int(jobs))
 
-        # Create SolutionBook is there's a need for it, otherwise create a SummaryFile
-        if _has(ctx, meeting, "use-notebooks"):
-            try:
-                notebook.make_solutionbook(ctx, meeting)
-                status.success("Successfully created SolutionBook.")
-            except Exception:
-                status.fail("Failed to create SolutionBook.")
-                raise
-
-            try:
-                if _has(ctx, meeting, "kaggle"):
-                    kaggle.kernel_metadata(ctx, meeting)
-                    status.success("Created `kernel-metadata.json`.")
-            except Exception:
-                status.fail("Failed to create `kernel-metadata.json`.")
-                raise
-        else:
-            try:
-                markdown.make_summaryfile(ctx, meeting)
-                status.success("Successfully created SummaryFile.")
-            except Exception:
-                status.fail("Failed to make SummaryFile.")
-                raise
-
-        # TODO Downloads papers
-        if _has(ctx, meeting, "papers"):
-            paper.download(ctx, meeting)
-
-
-@task
-def publish(ctx, group="", semester="", query=""):
-    """Prepares "camera-ready" versions of Meeting contents for public use."""
-    ctx = read_and_flatten(ctx, group=group, semester=semester)
-    print(f"# Publishing `{ctx.group.name.capitalize()}` Meetings")
+    notebooks = [x for x in rewritten if x is not None]
+    if notebooks:
+        status.begin("Standardize SolutionBooks")
+        status.success(f"Rewrote {sum(notebooks)} of {len(notebooks)} SolutionBook(s).")
+
+    # Papers for the whole semester are downloaded together
+    with_papers = [m for m in meetings if _has(ctx, m, "papers")]
+    if with_papers:
+        from .components import paper
+
+        status.begin("Download Papers")
+        paper.download_all(ctx, with_papers)
+
+
+def _publish(ctx, meeting, weight, links=None, built=None, force=False):
+    """Publishes a single Meeting; `publish` runs this serially or on a worker pool.
 
+    :params built: the Meeting's entry in the build manifest, from the last publish
+    :params force: publish even if nothing changed since the last publish
+
+    :returns: the Meeting's new entry for the build manifest
+    """
+    from .apis import kaggle
     from .components import notebook, markdown
+    from .tools import build
+
+    status.begin(meeting.title, meeting=str(meeting))
+    if re.match(r"meeting\d\d", meeting.filename):
+        status.fail("Template filename. Please rename.")
+        return None
+
+    if _has(ctx, meeting, "use-notebooks"):
+        ext = ctx.settings.suffixes.solutionbook
+    else:
+        ext = ctx.settings.suffixes.simplesummary
+    source = ctx.path / str(meeting) / f"{meeting.filename}{ext}"
+
+    inputs = build.inputs(ctx, meeting, source, weight=weight, links=links)
+    if not force and build.is_current(ctx, built, inputs):
+        status.success("Unchanged since it was last published. Skipped.")
+        return built
+
+    outputs = {}
+    if _has(ctx, meeting, "use-notebooks"):
+        try:
+            workbook = notebook.make_workbook(ctx, meeting)
+            outputs["workbook"] = build.output(ctx, workbook)
+            status.success("Successfully exported SolutionBook to WorkBook.")
+        except Exception:
+            status.fail("Failed to export SolutionBook to WorkBook.")
+            raise
+
+        try:
+            post = notebook.make_post(ctx, meeting, weight=weight, links=links)
+            outputs["post"] = build.output(ctx, post)
+            status.success("Successfully exported SolutionBook to post.")
+        except Exception:
+            status.fail("Failed to export SolutionBook to post.")
+            raise
+
+        try:
+            if _has(ctx, meeting, "kaggle"):
+                if kaggle.push_kernel(ctx, meeting):
+                    status.success("Successfully pushed WorkBook to Kaggle.")
+                else:
+                    status.success("WorkBook matches Kaggle's Kernel. Skipped push.")
+                outputs["kaggle"] = {"sha": outputs["workbook"]["sha"]}
+        except Exception:
+            status.fail("Failed to push WorkBook to Kaggle.")
+            raise
+    else:
+        try:
+            post = markdown.make_post(ctx, meeting, weight=weight, links=links)
+            outputs["post"] = build.output(ctx, post)
+            status.success("Successfully exported SummaryFile to post.")
+        except Exception:
+            status.fail("Failed to export SummaryFile to post.")
+            raise
+
+    return {"inputs": inputs, "outputs": outputs}
+
+
+@task(klass=Traced)
+def publish(
+    ctx, group="", semester="", query="", jobs=1, refresh_links=False, force=False
+):
+    """Prepares "camera-ready" versions of Meeting contents for public use.
+
+    `--query` picks out some Meetings, e.g. `regression,2020-10-01..2020-10-31` (see
+    `Syllabus.find`).
+    """
+    from .tools import urls, build
 
     ctx = read_and_flatten(ctx, group=group, semester=semester)
+    status.heading(f"Publishing `{ctx.group.name.capitalize()}` Meetings")
 
     # TODO Creates / renames meeting directories (and known contents)
-    weight = 0
     if query:
-        meetings = [search(ctx, query)]
-        weight = -1
+        meetings = _index(ctx).find(query)
     else:
         meetings = ctx.syllabus
 
+    # Check every link the semester needs in one batch, rather than per-Meeting
+    status.begin("Check Meeting Links")
+    links = urls.resolve(
+        ctx,
+        [m for m in meetings if not re.match(r"meeting\d\d", m.filename)],
+        refresh=refresh_links,
+    )
+    status.success(f"Checked links for {len(links)} Meeting(s).")
+
+    manifest = build.load(ctx)
+
+    # Weights are handed out up-front, so they don't depend on which worker finishes
+    #   first (or on which Meetings `query` picked); template Meetings don't take up a
+    #   weight.
+    weights, weight = {}, 0
+    for meeting in ctx.syllabus:
+        weights[meeting.id] = weight
+        if not re.match(r"meeting\d\d", meeting.filename):
+            weight += 1
+
+    calls = []
     for meeting in meetings:
-        print(f"## {meeting.title}")
-        if re.match("meeting\d\d", meeting.filename):
-            status.fail("Template filename. Please rename.")
-            continue
-
-        if _has(ctx, meeting, "use-notebooks"):
-            try:
-                notebook.make_workbook(ctx, meeting)
-                status.success("Successfully exported SolutionBook to WorkBook.")
-            except Exception:
-                status.fail("Failed to export SolutionBook to WorkBook.")
-                raise
-
-            try:
-                # import pdb; pdb.set_trace()
-                notebook.make_post(ctx, meeting, weight=weight)
-                status.success("Successfully exported SolutionBook to post.")
-            except Exception:
-                status.fail("Failed to export SolutionBook to post.")
-                raise
-
-            try:
-                if _has(ctx, meeting, "kaggle"):
-                    kaggle.push_kernel(ctx, meeting)
-                    status.success("Successfully pushed WorkBook to Kaggle.")
-            except Exception:
-                status.fail("Failed to push WorkBook to Kaggle.")
-                raise
+        built = manifest.get(meeting.id, None)
+        links_ = links.get(meeting.id, None)
+        calls.append((meeting, weights[meeting.id], links_, built, force))
+
+    entries = pool.run(ctx, _publish, calls, jobs=int(jobs))
 
-            # if _has(ctx, meeting, "kaggle"):
-            #     # TODO Creates `kernel-metadata.json` for Kaggle
-            #     kaggle.push_kernel(ctx, meeting)
-        else:
-            try:
-                markdown.make_post(ctx, meeting, weight=weight)
-                status.success("Successfully exported SummaryFile to post.")
-            except Exception:
-                status.fail("Failed to export SummaryFile to post.")
-                raise
+    for meeting, entry in zip(meetings, entries):
+        if entry:
+            manifest[meeting.id] = entry
+    build.save(ctx, manifest)
 
-        weight += 1
+
+def _index(ctx) -> "Syllabus":
+    from .concepts import Syllabus
+
+    if not isinstance(ctx.syllabus, Syllabus):
+        ctx.syllabus = Syllabus(ctx.syllabus)
+
+    return ctx.syllabus
 
 
 def search(ctx, query):
+    """Finds the Meeting `query` refers to, see `Syllabus.get`."""
+    from .concepts import Meeting
+
     if type(query) == Meeting:
         m = query
     elif type(query) == str:
-        bytitle = filter(lambda x: query.lower() in x.filename.lower(), ctx.syllabus)
-        m = list(bytitle)[0]
+        m = _index(ctx).get(query)
     else:
         raise ValueError("`query` must be a string or Meeting.")
 
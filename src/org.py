@@ -0,0 +1,101 @@
+"""Runs tasks for several Groups (and semesters) at once, e.g.
+
+    inv org.publish --groups core,gbms --semester fa20
+
+Everything that's shared (`config.yml` and the site's data) is loaded once, before
+each Group is handed to its own forked process. Pages shared by the Groups (like
+author pages) are edited under `hugo.site_lock`.
+"""
+from invoke import task
+
+from . import load_config
+from .tools import pool, status
+from .tools.trace import Traced
+
+
+def _split(values: str) -> list:
+    return [x.strip() for x in str(values).split(",") if x.strip()]
+
+
+def _batch(ctx, groups: str, semester: str) -> list:
+    """Loads the shared state and lists every (group, semester) pair to run."""
+    from .apis import hugo
+    from .components import website
+
+    groups, semesters = _split(groups), _split(semester) or [""]
+    if not groups:
+        raise ValueError("Specify at least one Group, e.g. `--groups core,gbms`.")
+
+    ctx["settings"] = load_config()
+    hugo._site_src(ctx)
+    try:
+        website.officer_ranks()
+    except FileNotFoundError:
+        status.warn("Couldn't find the site's data; each Group will look for it.")
+
+    return [(group, semester) for semester in semesters for group in groups]
+
+
+def _jobs(jobs, batch: list) -> int:
+    return int(jobs) if int(jobs) > 0 else len(batch)
+
+
+def _touch(ctx, group, semester, jobs):
+    from . import group as group_, meeting
+
+    group_.touch(ctx, group=group, semester=semester)
+    meeting.touch(ctx, group=group, semester=semester, jobs=jobs)
+
+
+def _publish(ctx, group, semester, jobs, refresh_links, force):
+    from . import meeting
+
+    meeting.publish(
+        ctx,
+        group=group,
+        semester=semester,
+        jobs=jobs,
+        refresh_links=refresh_links,
+        force=force,
+    )
+
+
+@task(klass=Traced)
+def touch(ctx, groups="", semester="", jobs=0, meeting_jobs=1):
+    """Touches the Groups (and their Meetings) for one or more semesters.
+
+    `--groups` and `--semester` take comma-separated lists. `--jobs` is how many Groups
+    run at once (all of them, by default); `--meeting-jobs` is passed on as each
+    Group's `--jobs`.
+    """
+    batch = _batch(ctx, groups, semester)
+    status.heading(f"Touching {len(batch)} Group semester(s)")
+
+    calls = [(group, semester, int(meeting_jobs)) for group, semester in batch]
+    pool.run(ctx, _touch, calls, jobs=_jobs(jobs, batch))
+
+
+@task(klass=Traced)
+def publish(
+    ctx,
+    groups="",
+    semester="",
+    jobs=0,
+    meeting_jobs=1,
+    refresh_links=False,
+    force=False,
+):
+    """Publishes the Meetings of several Groups for one or more semesters.
+
+    `--groups` and `--semester` take comma-separated lists. `--jobs` is how many Groups
+    run at once (all of them, by default); `--meeting-jobs` is passed on as each
+    Group's `--jobs`.
+    """
+    batch = _batch(ctx, groups, semester)
+    status.heading(f"Publishing {len(batch)} Group semester(s)")
+
+    calls = [
+        (group, semester, int(meeting_jobs), refresh_links, force)
+        for group, semester in batch
+    ]
+    pool.run(ctx, _publish, calls, jobs=_jobs(jobs, batch))
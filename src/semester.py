@@ -0,0 +1,345 @@
+"""Watches a semester's directory, and re-touches/re-publishes whatever changed, e.g.
+
+    inv semester.watch --group core --semester fa20
+
+The process stays up between changes, so the settings, Syllabus (see `tools.yamlcache`),
+templates, and Hugo session are only loaded once. Changes are picked up with inotify
+(on Linux) or by polling, and a burst of them (e.g. an editor saving several files) is
+handled as one. Each changed file is mapped to its Meeting (see `tools.layout`), and
+only those Meetings are touched and published:
+
+- files in a Meeting's directory affect that Meeting
+- `syllabus.yml` affects the Meetings whose entries changed (and `group.touch` is run,
+  to rename directories), then everything is published (see `tools.build`, which
+  skips Meetings that didn't change)
+- `group.yml` affects every Meeting
+
+Hidden files (e.g. our manifests, caches, and editors' swap files) are ignored, as is
+anything the tasks themselves write (or rename, or remove) while rebuilding; anything
+else that changes in the meantime is rebuilt next.
+"""
+import os
+import sys
+import time
+import select
+import ctypes
+import ctypes.util
+import struct
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+
+from invoke import task
+
+from . import read_and_flatten
+from .tools import status, layout
+from .tools.trace import Traced
+
+
+def _hidden(path: Path) -> bool:
+    return any(x.startswith(".") for x in path.parts) or path.suffix == ".tmp"
+
+
+def _walk(root: Path):
+    """Yields every directory under `root` (and `root`), skipping hidden ones."""
+    for parent, dirs, _ in os.walk(root):
+        dirs[:] = [x for x in dirs if not x.startswith(".")]
+        yield Path(parent)
+
+
+# region Watchers
+class _Poller:
+    """Finds changes by comparing the size and mtime of every file, every `interval`."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.seen = self._scan()
+
+    def _scan(self) -> dict:
+        seen = {}
+        for parent in _walk(self.root):
+            try:
+                entries = list(os.scandir(parent))
+            except FileNotFoundError:
+                continue  # removed since it was listed
+
+            for entry in entries:
+                try:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        seen[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+                except FileNotFoundError:
+                    continue
+
+        return seen
+
+    def changes(self, timeout: float) -> set:
+        time.sleep(timeout)
+        seen, self.seen = self.seen, self._scan()
+
+        paths = seen.keys() | self.seen.keys()
+        return {x for x in paths if seen.get(x, None) != self.seen.get(x, None)}
+
+    def refresh(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Inotify:
+    """Finds changes with Linux's inotify (through libc, so nothing to install)."""
+
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+    IN_ISDIR = 0x40000000
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._open()
+
+    def _open(self):
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Couldn't start inotify.")
+
+        self.watches = {}
+        for parent in _walk(self.root):
+            self._add(parent)
+
+    def _add(self, path: Path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+
+    def changes(self, timeout: float) -> set:
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, size = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = data[offset : offset + size].rstrip(b"\0")
+                offset += size
+
+                if wd not in self.watches or not name:
+                    continue
+
+                path = self.watches[wd] / os.fsdecode(name)
+                if mask & self.IN_ISDIR:
+                    # new directories need watching too (e.g. a new Meeting's)
+                    if mask & (0x80 | 0x100) and not path.name.startswith("."):
+                        for parent in _walk(path):
+                            self._add(parent)
+                    continue
+
+                changed.add(path)
+
+        return changed
+
+    def refresh(self):
+        # Directories may have been renamed (e.g. by `group.touch`), which leaves their
+        #   watches with stale paths; watching an inode again updates its path
+        for parent in _walk(self.root):
+            self._add(parent)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _watcher(root: Path, poll: bool = False):
+    if not poll:
+        try:
+            return _Inotify(root)
+        except (OSError, AttributeError, TypeError):
+            status.warn("inotify isn't available here; polling for changes instead.")
+
+    return _Poller(root)
+
+
+# endregion
+
+
+# region Our own writes
+# while recording, paths this process (and the workers it forks, which share the file
+#   descriptor) opens for writing, renames, or removes are appended to this log
+_log = None
+_hooked = False
+
+
+def _audit(event: str, args: tuple):
+    if _log is None:
+        return
+
+    if event == "open":
+        path, mode, flags = args
+        if mode is None:
+            writing = flags & (os.O_WRONLY | os.O_RDWR)
+        else:
+            writing = any(x in mode for x in "wax+")
+        paths = [path] if writing else []
+    elif event == "os.rename":  # `os.replace`, too
+        paths = args[:2]
+    elif event in ["os.remove", "os.rmdir"]:
+        paths = args[:1]
+    else:
+        return
+
+    for path in paths:
+        if isinstance(path, (str, bytes, os.PathLike)):
+            os.write(_log, os.fsencode(os.path.abspath(path)) + b"\n")
+
+
+@contextmanager
+def _recording():
+    """Yields the set of paths written while in the block (filled in when it ends)."""
+    global _log, _hooked
+    if not _hooked:
+        sys.addaudithook(_audit)
+        _hooked = True
+
+    written = set()
+    with tempfile.TemporaryFile() as log:
+        _log = log.fileno()
+        try:
+            yield written
+        finally:
+            _log = None
+            log.seek(0)
+            written.update(Path(os.fsdecode(x)) for x in log.read().splitlines())
+
+
+def _ours(path: Path, written: set) -> bool:
+    path = Path(os.path.abspath(path))
+    return any(x in written for x in [path, *path.parents])
+
+
+# endregion
+
+
+# region Changes to Meetings
+def _fingerprints(ctx) -> dict:
+    """:returns: dict mapping each Meeting's id to a hash of its `syllabus.yml` entry"""
+    from .tools import build
+
+    return {m.id: build.sha_data([m.required, m.optional]) for m in ctx.syllabus}
+
+
+def _directories(ctx) -> dict:
+    return {entry["dir"]: sha for sha, entry in layout.load(ctx.path).items()}
+
+
+def _affected(ctx, changed: set, known: dict) -> tuple:
+    """Maps changed files to the Meetings they affect.
+
+    :params known: `_fingerprints` from before the change
+
+    :returns: the ids of the affected Meetings, whether the Group itself changed (i.e.
+        `group.yml` or `syllabus.yml`), and the new fingerprints
+    """
+    names = {x.relative_to(ctx.path).parts[0] for x in changed}
+    directories = _directories(ctx)
+    ids = {directories[name] for name in names if name in directories}
+
+    regroup = bool(names & {"group.yml", "syllabus.yml"})
+    fingerprints = known
+    if regroup:
+        group, semester = ctx.group.name, ctx.group.semester
+        ctx = read_and_flatten(ctx, group=group, semester=semester)
+        fingerprints = _fingerprints(ctx)
+
+        if "group.yml" in names:
+            ids = set(fingerprints)
+        else:
+            ids |= {k for k, v in fingerprints.items() if known.get(k, None) != v}
+
+    return ids & set(fingerprints), regroup, fingerprints
+
+
+def _rerun(ctx, ids: set, regroup: bool, jobs: int):
+    from . import group as group_, meeting
+
+    group, semester = ctx.group.name, ctx.group.semester
+    query = ",".join(sorted(str(x) for x in ids))
+
+    if regroup:
+        group_.touch(ctx, group=group, semester=semester)
+    if ids:
+        meeting.touch(ctx, group=group, semester=semester, query=query, jobs=jobs)
+    if ids or regroup:
+        # everything's weight/links may have moved when the Syllabus changed
+        query = "" if regroup else query
+        meeting.publish(ctx, group=group, semester=semester, query=query, jobs=jobs)
+
+
+# endregion
+
+
+@task(klass=Traced)
+def watch(ctx, group="", semester="", interval=0.5, debounce=0.3, poll=False, jobs=1):
+    """Re-touches and re-publishes the Meetings affected by each change to a semester.
+
+    `--interval` is how often (in seconds) to look for changes; a burst of changes ends
+    once nothing's changed for `--debounce` seconds. `--poll` looks for changes by
+    polling, even where inotify is available.
+    """
+    # the templates are loaded now, rather than on the first change
+    from . import j2env
+
+    ctx = read_and_flatten(ctx, group=group, semester=semester)
+    status.heading(f"Watching `{ctx.path}` for Changes")
+
+    known = _fingerprints(ctx)
+    watcher = _watcher(ctx.path, poll=poll)
+    status.success(f"Watching {len(known)} Meeting(s) with `{type(watcher).__name__}`.")
+    status.flush()
+
+    pending = set()
+    try:
+        while True:
+            changed, pending = pending | watcher.changes(float(interval)), set()
+            if not changed:
+                continue
+
+            # wait for the burst to settle
+            while True:
+                burst = watcher.changes(float(debounce))
+                if not burst:
+                    break
+                changed |= burst
+
+            changed = {x for x in changed if not _hidden(x.relative_to(ctx.path))}
+            if not changed:
+                continue
+
+            start = time.perf_counter()
+            with _recording() as written:
+                try:
+                    ids, regroup, known = _affected(ctx, changed, known)
+                    _rerun(ctx, ids, regroup, int(jobs))
+                except (Exception, SystemExit) as error:
+                    n = len(changed)
+                    status.fail(f"Couldn't rebuild after {n} file(s) changed.")
+                    status.fail(f"`{type(error).__name__}`: {error}")
+                else:
+                    took = time.perf_counter() - start
+                    status.success(f"Rebuilt {len(ids)} Meeting(s) in {took:.2f}s.")
+                finally:
+                    status.flush()
+
+            # what the tasks wrote isn't a change to rebuild for, but anything else
+            #   that changed meanwhile (e.g. the author saving again) is
+            watcher.refresh()
+            pending = {x for x in watcher.changes(0) if not _ours(x, written)}
+    except KeyboardInterrupt:
+        status.success("Stopped watching.")
+    finally:
+        watcher.close()
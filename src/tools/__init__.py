@@ -1,10 +1,21 @@
-from . import status, cal, urls
-from .editFM import EditableFM
+# NOTE submodules aren't imported here, so `from .tools import status` doesn't drag in
+#   pandas (`cal`), requests (`urls`), or ruamel (`editFM`) along with it
+
+
+def __getattr__(name):
+    if name in ["EditableFM", "FMBatch"]:
+        from . import editFM
+
+        return getattr(editFM, name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
     "cal",
     "urls",
     "status",
+    "pool",
     "EditableFM",
+    "FMBatch",
 ]
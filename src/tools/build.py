@@ -0,0 +1,101 @@
+"""Keeps a per-semester manifest of what `meeting.publish` built, and from what.
+
+For every Meeting, the manifest (`.build.json`, in the semester's directory) records
+hashes of its inputs — the SolutionBook/SummaryFile, its `syllabus.yml` entry, the
+Group's settings, its weight and links, and our templates — and of the outputs that
+were written from them. A Meeting whose inputs are unchanged, and whose outputs are
+untouched, doesn't need to be published again. Outputs are recorded relative to the
+semester's directory, or to the site's, so the manifest holds up wherever `inv` is run.
+"""
+import os
+import json
+from hashlib import sha256
+from pathlib import Path
+from functools import lru_cache
+
+FILENAME = ".build.json"
+CHUNK = 1 << 16
+
+
+def sha_file(path) -> str:
+    digest = sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def sha_data(data) -> str:
+    return sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def sha_templates() -> str:
+    templates = Path(__file__).parent.parent / "templates"
+    files = sorted(x for x in templates.rglob("*") if x.is_file())
+    return sha_data({str(x.relative_to(templates)): sha_file(x) for x in files})
+
+
+def load(ctx) -> dict:
+    try:
+        return json.load(open(ctx.path / FILENAME, "r"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save(ctx, manifest: dict):
+    path = ctx.path / FILENAME
+    tmp = path.with_name(f"{path.name}.tmp")
+    json.dump(manifest, open(tmp, "w"), indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def inputs(ctx, m, source: Path, **kwargs) -> dict:
+    """Hashes everything a Meeting's published outputs are derived from.
+
+    :params source: the Meeting's SolutionBook or SummaryFile
+    :params kwargs: anything else (e.g. weight, links) that ends up in the outputs
+    """
+    return {
+        "source": sha_file(source) if source.exists() else "",
+        "meeting": sha_data([m.required, m.optional]),
+        "group": sha_data([ctx.group.required, ctx.group.optional]),
+        "templates": sha_templates(),
+        "extra": sha_data(kwargs),
+    }
+
+
+def _roots(ctx) -> dict:
+    from ..apis import hugo
+
+    return {
+        "semester": Path(os.path.abspath(ctx.path)),
+        "site": Path(os.path.abspath(hugo._site_src(ctx))),
+    }
+
+
+def output(ctx, path) -> dict:
+    """Hashes an output, noting its `path` relative to the semester's or site's root."""
+    path, sha = Path(os.path.abspath(path)), sha_file(path)
+    for root, parent in _roots(ctx).items():
+        if parent in path.parents:
+            return {"root": root, "path": str(path.relative_to(parent)), "sha": sha}
+
+    return {"path": str(path), "sha": sha}
+
+
+def is_current(ctx, entry: dict, inputs: dict) -> bool:
+    """Checks the recorded inputs match, and the recorded outputs weren't touched."""
+    if not entry or entry.get("inputs", {}) != inputs:
+        return False
+
+    roots = _roots(ctx)
+    for out in entry.get("outputs", {}).values():
+        if "path" not in out:
+            continue
+        path = roots[out["root"]] / out["path"] if "root" in out else Path(out["path"])
+        if not path.exists() or sha_file(path) != out["sha"]:
+            return False
+
+    return True
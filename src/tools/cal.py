@@ -1,5 +1,11 @@
-from typing import Union
+import re
+import os
+import json
+from pathlib import Path
+from typing import List, Union
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 import requests
 
@@ -7,6 +13,10 @@ from ..concepts import Group
 
 # it's unlikely this URL will change, but should be occassionally checked
 CALENDAR_URL = "https://calendar.ucf.edu"
+# snapshots of each term's events are kept here, as `<year>-<longname>.json`, so a term
+#   is only ever downloaded once; relative to where `inv` runs (like `config.yml`),
+#   unless `AUTOBOT_CALENDARS` says otherwise
+CALENDAR_STORE = Path(os.environ.get("AUTOBOT_CALENDARS", ".calendars"))
 # these holidays need to match, specifically, how UCF labels them
 OBS_HOLIDAYS = {
     "spring": ["Spring Break", "Martin Luther King Jr. Day"],
@@ -27,89 +37,287 @@ SEMESTER_LEN = {k: v - 1 for k, v in SEMESTER_LEN.items()}
 NEXT_SEMESTER = {"spring": "fall", "summer": "fall", "fall": "spring"}
 
 
+# How a meeting that lands on a holiday is handled: "skip" drops it, "forward" and
+#   "backward" move it to the nearest day that isn't a holiday.
+POLICIES = ("skip", "forward", "backward")
+
+
 def temp_schedule(group: Group):
-    return make_schedule(group.semester)
+    return make_schedule(group.semester, policy=group.optional.get("holidays", "skip"))
+
+
+def make_schedule(
+    group_or_shortname: Union[str, Group], delta: int = 7, policy: str = ""
+) -> List[pd.Timestamp]:
+    return make_schedules([group_or_shortname], delta=delta, policy=policy)[0]
+
+
+def make_schedules(
+    groups_or_shortnames: List[Union[str, Group]], delta: int = 7, policy: str = ""
+) -> List[List[pd.Timestamp]]:
+    """Builds the schedule for each Group (or semester), one call per semester.
+
+    A semester's schedule starts `delta` days into the term; a Group's starts on its
+    `startdate` and repeats every `delta * frequency` days. Either runs until the term's
+    last day of classes (including the first date on/after it).
+
+    :params policy: one of `POLICIES`; by default, the Group's `holidays` option (or
+        "skip")
+    """
+    rows = {}
+    for idx, x in enumerate(groups_or_shortnames):
+        if type(x) == str:
+            semester = x
+            begin = pd.Timestamp(load_index(semester)["begin"])
+            # typically, we've started group meetings in the 3rd week of the semester
+            row = (begin + pd.Timedelta(days=delta), delta, policy or "skip")
+        else:
+            assert isinstance(x, Group)
+            semester = x.semester
+            policy_ = policy or x.optional.get("holidays", "skip")
+            row = (x.startdate, delta * x.frequency, policy_)
+        rows.setdefault((semester, row[-1]), []).append((idx, row[:-1]))
+
+    schedules = [None] * len(groups_or_shortnames)
+    for (semester, policy_), batch in rows.items():
+        idxs, batch = zip(*batch)
+        starts, deltas = zip(*batch)
+        end = pd.Timestamp(load_index(semester)["end"])
+        built = schedule(
+            starts, [end] * len(starts), deltas, holiday_index(semester), policy_
+        )
+        for idx, dates in zip(idxs, built):
+            schedules[idx] = dates
+
+    return schedules
+
+
+def schedule(
+    starts: list,
+    ends: list,
+    deltas: list,
+    holidays: pd.IntervalIndex = None,
+    policy: str = "skip",
+) -> List[List[pd.Timestamp]]:
+    """Builds one schedule per (`start`, `end`, `delta`), all at once.
+
+    Every schedule is a row of a `datetime64` grid (`start + k * delta`) which runs
+    until the first date on/after `end`; `holidays` are applied to the whole grid with
+    NumPy's business-day functions (where every day of the week is a "business day").
+    Times of day on `starts` are kept.
+
+    :params deltas: days between meetings
+    :params holidays: closed intervals of days to avoid, see `holiday_index`
+    :params policy: one of `POLICIES`
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"`policy` must be one of {POLICIES}, not `{policy}`.")
 
+    starts = pd.DatetimeIndex(starts)
+    times = (starts - starts.normalize()).values
+    days = starts.values.astype("datetime64[D]")
+    ends = pd.DatetimeIndex(ends).values.astype("datetime64[D]")
+    deltas = np.asarray(deltas, dtype=int)
 
-def make_schedule(group_or_shortname: Union[str, Group], delta: int = 7):
-    # import pdb; pdb.set_trace()
-    if type(group_or_shortname) == str:
-        semester = group_or_shortname
-        date_range, holidays = parse_calendar(semester)
-        # on average, we've had 10 meetings per semester in the past
-        # typically, we've started group meetings in the 3rd week of the semester
-        startdate = date_range.iloc[0] + pd.Timedelta(days=delta)
+    # the k-th date is kept while the (k-1)-th is before `end`
+    n = np.maximum(-(-(ends - days).astype(int) // deltas), 0) + 1
+    k = np.arange(n.max(initial=0))
+    grid = days[:, None] + (k[None, :] * deltas[:, None]).astype("timedelta64[D]")
+    keep = k[None, :] < n[:, None]
+
+    off = _holiday_days(holidays)
+    if policy == "skip":
+        keep &= np.is_busday(grid, weekmask="1111111", holidays=off)
     else:
-        assert isinstance(group_or_shortname, Group)
-        group = group_or_shortname
-        date_range, holidays = parse_calendar(group.semester)
-        delta *= group.frequency
+        grid = np.busday_offset(grid, 0, roll=policy, weekmask="1111111", holidays=off)
+        # moving around a long break may land two meetings on the same day
+        keep[:, 1:] &= grid[:, 1:] != grid[:, :-1]
+
+    grid = grid.astype("datetime64[ns]") + times[:, None]
+
+    return [[pd.Timestamp(x) for x in row[mask]] for row, mask in zip(grid, keep)]
+
 
-        startdate = group.startdate
+def holiday_index(shortname: str) -> pd.IntervalIndex:
+    """The term's observed holidays, as closed intervals of days."""
+    spans = load_index(shortname)["holidays"]
 
-    dates = [startdate]
-    while dates[-1] < date_range.iloc[-1]:
-        dates.append(dates[-1] + pd.Timedelta(days=delta))
+    return pd.IntervalIndex.from_arrays(
+        pd.to_datetime([beg for beg, _ in spans.values()]),
+        pd.to_datetime([end for _, end in spans.values()]),
+        closed="both",
+    )
 
-    # Assume a once-a-week meeting basis and build the schedule accordingly.
-    meeting_dates = pd.Series(dates)
 
-    if holidays:
-        holidays = pd.concat(holidays)
-        # Removes Holidays, if the array is non-empty.
-        meeting_dates = meeting_dates[~meeting_dates.isin(holidays)]
+def _holiday_days(holidays: pd.IntervalIndex = None) -> np.ndarray:
+    if holidays is None or len(holidays) == 0:
+        return np.array([], dtype="datetime64[D]")
 
-    schedule = [pd.Timestamp(x) for x in meeting_dates]
+    left = holidays.left.values.astype("datetime64[D]")
+    right = holidays.right.values.astype("datetime64[D]")
+    lengths = (right - left).astype(int) + 1
+    # each holiday's days, as `left + 0`, `left + 1`, ..., `right`
+    firsts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    offsets = np.arange(lengths.sum()) - firsts
 
-    return schedule
+    return np.repeat(left, lengths) + offsets.astype("timedelta64[D]")
 
 
-def parse_calendar(shortname: str) -> tuple:
+def _snapshot(shortname: str) -> Path:
+    longname = SHORT_LONG[shortname[:2]]
+    return CALENDAR_STORE / f"20{shortname[-2:]}-{longname}.json"
+
+
+@lru_cache(maxsize=None)
+def load_index(shortname: str) -> dict:
+    """Loads the term's index, downloading (and storing) its events if they're unknown.
+
+    :returns: dict with the "begin" and "end" of classes, and "holidays" mapping each
+        observed holiday to its first and last day
+    """
+    try:
+        snapshot = json.load(open(_snapshot(shortname), "r"))
+    except FileNotFoundError:
+        snapshot = store(shortname, fetch_events(shortname))
+
+    return snapshot["index"]
+
+
+def fetch_events(shortname: str) -> list:
     longname = SHORT_LONG[shortname[:2]]
-    holidays = OBS_HOLIDAYS[longname]
 
     # This is the URL for the calendar's JSON-based API. This will vary by institution.
     calendar_url = f"{CALENDAR_URL}/json/20{shortname[-2:]}/{longname}"
 
     # UCF's JSON object holds all the "events" in an "events" identifier
-    ucf_parsed = requests.get(calendar_url).json()["terms"][0]["events"]
-    df_calendar = pd.DataFrame.from_dict(ucf_parsed)
-
-    # The "summary" column of the new DataFrame holds the names of the events
-    summary_mask = df_calendar["summary"]
-    # Events are stored as arrays. It's easier to parse this way than reducing
-    #   the list-containing column to something that isn't.
-    starts = df_calendar.loc[summary_mask.str.contains("Classes Begin")].iloc[0]
-    ends = df_calendar.loc[summary_mask.str.contains("Classes End")].iloc[0]
-
-    # generate a DataFrame with all possible dates (to act like a calendar)
-    date_range = pd.Series(
-        pd.date_range(start=starts["dtstart"][:-1], end=ends["dtstart"][:-1])
-    )
+    return _from_json(requests.get(calendar_url).json())
+
 
-    # Remove the Holidays, since we assume students won't meet on those days.
-    holidays = []
-    for holiday in OBS_HOLIDAYS[longname]:
-        day2remove = df_calendar.loc[summary_mask.str.contains(holiday)].iloc[0]
-        beg = day2remove["dtstart"][:-1]
-        end = day2remove["dtend"][:-1] if day2remove["dtend"] else beg
-        holidays.append(pd.Series(pd.date_range(start=beg, end=end)))
+def store(shortname: str, events: list) -> dict:
+    """Indexes `events` and saves them as the term's snapshot."""
+    snapshot = {
+        "semester": shortname,
+        "index": make_index(shortname, events),
+        "events": events,
+    }
 
-    return date_range, holidays
+    CALENDAR_STORE.mkdir(parents=True, exist_ok=True)
+    json.dump(snapshot, open(_snapshot(shortname), "w"), indent=2)
+    load_index.cache_clear()
+
+    return snapshot
+
+
+def import_calendar(path: Union[str, Path], shortname: str) -> dict:
+    """Stores a local JSON (in UCF's format) or ICS calendar as the term's snapshot."""
+    path = Path(path)
+    if path.suffix.lower() == ".ics":
+        events = _from_ics(open(path, "r").read())
+    else:
+        events = _from_json(json.load(open(path, "r")))
+
+    return store(shortname, events)
+
+
+def make_index(shortname: str, events: list) -> dict:
+    """Finds when classes begin/end and when holidays are, in one pass over `events`.
+
+    Like UCF's calendar, the first event whose summary _contains_ a label wins.
+    """
+    longname = SHORT_LONG[shortname[:2]]
+    labels = ["Classes Begin", "Classes End"] + OBS_HOLIDAYS[longname]
+
+    found = {}
+    for event in events:
+        for label in labels:
+            if label not in found and label in event["summary"]:
+                found[label] = (event["start"], event["end"])
+
+    return {
+        "begin": found["Classes Begin"][0],
+        "end": found["Classes End"][0],
+        "holidays": {k: found[k] for k in OBS_HOLIDAYS[longname] if k in found},
+    }
+
+
+def _day(timestamp: str) -> str:
+    # UCF's timestamps are UTC (trailing "Z"), ICS dates are `YYYYMMDD[THHMMSSZ]`
+    return pd.Timestamp(timestamp.rstrip("Z")).date().isoformat()
+
+
+def _from_json(parsed: Union[dict, list]) -> list:
+    if isinstance(parsed, dict):
+        parsed = parsed["terms"][0]["events"]
+
+    events = []
+    for event in parsed:
+        start = _day(event["dtstart"])
+        end = _day(event["dtend"]) if event.get("dtend", None) else start
+        events.append({"summary": event["summary"], "start": start, "end": end})
+
+    return events
+
+
+def _from_ics(text: str) -> list:
+    # unfold continuation lines, https://tools.ietf.org/html/rfc5545#section-3.1
+    text = re.sub(r"\r?\n[ \t]", "", text)
+
+    events = []
+    for block in re.findall(r"BEGIN:VEVENT(.*?)END:VEVENT", text, flags=re.DOTALL):
+        fields = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(":")
+            fields[key.split(";")[0].upper()] = value.strip()
+
+        start = _day(fields["DTSTART"])
+        end = start
+        if "DTEND" in fields:
+            end = _day(fields["DTEND"])
+            # all-day events end on the (exclusive) following day
+            if "T" not in fields["DTEND"] and end > start:
+                end = (pd.Timestamp(end) - pd.Timedelta(days=1)).date().isoformat()
+
+        summary = fields.get("SUMMARY", "")
+        events.append({"summary": summary, "start": start, "end": end})
+
+    return events
+
+
+def _current_semester():
+    """Finds the stored term that today falls in, if any."""
+    today = pd.Timestamp.today().date().isoformat()
+    for snapshot in sorted(CALENDAR_STORE.glob("*.json")):
+        index = json.load(open(snapshot, "r"))["index"]
+        if index["begin"] <= today <= index["end"]:
+            return snapshot.stem.split("-")
+
+    return None
 
 
 def get_next_semester(ctx, group: str) -> Group:
     """Infers the current semester based on today's date.
 
-    Takes advantage of the redirection https://ucf.calendar.edu/ has built-in.
+    Prefers the stored calendars, otherwise takes advantage of the redirection
+    https://ucf.calendar.edu/ has built-in.
     """
-    url = requests.get(CALENDAR_URL).url
-
-    year, sem = url.replace(f"{CALENDAR_URL}/", "").split("/")
+    current = _current_semester()
+    if current:
+        year, sem = current
+    else:
+        url = requests.get(CALENDAR_URL).url
+        year, sem = url.replace(f"{CALENDAR_URL}/", "").split("/")
 
     if sem == "fall":
         year = f"{int(year) + 1}"
 
     sem = NEXT_SEMESTER[sem]
 
-    return Group(semester=f"{LONG_SHORT[sem]}{year[-2:]}", name=group)
+    defaults = ctx.settings.defaults[group]
+    return Group(
+        required={
+            "name": group,
+            "semester": f"{LONG_SHORT[sem]}{year[-2:]}",
+            "frequency": defaults.frequency,
+            "use-notebooks": defaults.needs_notebooks,
+        }
+    )
@@ -1,3 +1,6 @@
+import io
+import os
+import re
 from pathlib import Path
 
 from ruamel.yaml import YAML
@@ -11,32 +14,96 @@ class EditableFM:
         self.delim = delim
 
     def load(self, file: Path):
-        self.fm = []
-        self.content = []
-
         self.path = self.base_path / file
 
-        file = open(self.path, "r").readlines()
+        self._text = open(self.path, "r").read()
+
+        # Front matter sits between the first two delimiters; the body (everything after
+        #   the closing delimiter) is kept as-is, without scanning or parsing it
+        delims = re.compile(f"^{re.escape(self.delim)}", flags=re.MULTILINE)
+
+        start = 0
+        if self._text.startswith(self.delim):
+            start = self._text.find("\n") + 1 or len(self._text)
 
-        lineno = 0
-        delims_seen = 0
-        for line in file:
-            if line.startswith(self.delim):
-                delims_seen += 1
-            else:
-                if delims_seen < 2:
-                    self.fm.append(line)
-                else:
-                    self.content.append(line)
+        closing = delims.search(self._text, start)
+        if closing:
+            fm = self._text[start : closing.start()]
+            body = self._text.find("\n", closing.end())
+            self.content = self._text[body + 1 :] if body > -1 else ""
+        else:
+            fm, self.content = self._text[start:], ""
 
         # Parse YAML, trying to preserve comments and whitespace
-        self.fm = yaml.load("".join(self.fm))
+        self.fm = yaml.load(fm)
 
-    def dump(self):
+        return self
+
+    def dumps(self) -> str:
         assert self.path, "You need to `.load()` first."
 
-        with open(self.path, "w") as f:
-            f.write(f"{self.delim}\n")
-            yaml.dump(self.fm, f)
-            f.write(f"{self.delim}\n")
-            f.writelines(self.content)
+        fm = io.StringIO()
+        yaml.dump(self.fm, fm)
+
+        content = self.content
+        if not isinstance(content, str):
+            content = "".join(content)
+
+        return f"{self.delim}\n{fm.getvalue()}{self.delim}\n{content}"
+
+    def dump(self) -> bool:
+        """Writes the page back, but only if it changed.
+
+        Unchanged pages keep their mtime (so Hugo doesn't rebuild them), and changed
+        ones are written to a temporary file that then replaces the page.
+
+        :returns: whether the page was written
+        """
+        text = self.dumps()
+        if text == self._text:
+            return False
+
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+
+        self._text = text
+        return True
+
+
+class FMBatch:
+    """Edits many pages, and writes all the changed ones in one `flush()`.
+
+    Used as a context manager, everything is flushed on a clean exit:
+
+        with FMBatch() as batch:
+            for page in pages:
+                batch.edit(page).fm["title"] = ...
+    """
+
+    def __init__(self, delim: str = "---"):
+        self.delim = delim
+        self.editors = {}
+
+    def edit(self, path: Path) -> EditableFM:
+        """Loads `path` (once per batch) and returns its editor."""
+        path = Path(path)
+        if path not in self.editors:
+            self.editors[path] = EditableFM(path.parent, self.delim).load(path.name)
+
+        return self.editors[path]
+
+    def flush(self) -> int:
+        """:returns: number of pages that were written"""
+        written = sum(editor.dump() for editor in self.editors.values())
+        self.editors = {}
+
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,70 @@
+"""Keeps track of where each Meeting lives in a semester's directory.
+
+The manifest (`.meetings.json`, in the semester's directory) maps each Meeting's id to
+its directory (e.g. `09-18-regression`). Resolving a semester's layout is then a single
+read (and a glob, to spot directories the manifest doesn't know), instead of opening
+every `.metadata` file. If the manifest is missing (or out of date), it's rebuilt from
+those `.metadata` files.
+"""
+import os
+import json
+import fcntl
+from pathlib import Path
+from contextlib import contextmanager
+
+FILENAME = ".meetings.json"
+
+
+def rebuild(parent: Path) -> dict:
+    """Recovers the layout from each Meeting directory's `.metadata`."""
+    meetings = {}
+    for folder in sorted(x for x in parent.glob("??-??-*/") if x.is_dir()):
+        try:
+            sha = open(folder / ".metadata", "r").read()
+        except FileNotFoundError:
+            continue
+
+        meetings[sha] = {"dir": folder.name}
+
+    return meetings
+
+
+def load(parent: Path) -> dict:
+    """:returns: dict mapping Meeting ids to `{"dir": ...}`"""
+    parent = Path(parent)
+    try:
+        meetings = json.load(open(parent / FILENAME, "r"))
+    except (FileNotFoundError, ValueError):
+        return rebuild(parent)
+
+    # directories renamed/removed/added by hand make the manifest stale
+    known = {entry["dir"] for entry in meetings.values()}
+    if known != {x.name for x in parent.glob("??-??-*/") if x.is_dir()}:
+        return rebuild(parent)
+
+    return meetings
+
+
+def save(parent: Path, meetings: dict):
+    path = Path(parent) / FILENAME
+    tmp = path.with_name(f"{path.name}.tmp")
+    json.dump(meetings, open(tmp, "w"), indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def transaction(parent: Path):
+    """Yields the layout for editing; it's saved only if the block succeeds.
+
+    Transactions on the same semester are serialized by locking its directory.
+    """
+    parent = Path(parent)
+    lock = os.open(parent, os.O_RDONLY)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        meetings = load(parent)
+        yield meetings
+        save(parent, meetings)
+    finally:
+        os.close(lock)
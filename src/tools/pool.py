@@ -0,0 +1,119 @@
+"""Fans per-meeting work out to a pool of processes.
+
+Workers are forked from the running `inv` process, so they inherit the already-loaded
+Context (settings, Group, and Syllabus) instead of re-reading it from disk. Anything a
+worker prints (or reports, see `status`, or traces, see `trace`) is buffered and handed
+back, so output can be replayed in order.
+"""
+import io
+import sys
+import traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import redirect_stdout
+
+from . import status, trace
+
+# Set right before forking, so each worker sees the parent's Context and calls without
+#   having to pickle either of them
+_ctx = None
+_calls = []
+_teardowns = []
+
+
+class RemoteTraceback(Exception):
+    """Carries a worker's (formatted) traceback, as the cause of its re-raised error."""
+
+    def __str__(self):
+        return self.args[0]
+
+
+def teardown(fn):
+    """Has workers call `fn()` after each call they run (they exit without `atexit`)."""
+    _teardowns.append(fn)
+    return fn
+
+
+def _call(fn, idx):
+    buffer = io.StringIO()
+    result, failure = None, None
+    with redirect_stdout(buffer):
+        try:
+            result = fn(_ctx, *_calls[idx])
+        except Exception as error:
+            failure = (error, traceback.format_exc())
+
+        for cleanup in _teardowns:
+            try:
+                cleanup()
+            except Exception as error:
+                failure = failure or (error, traceback.format_exc())
+
+    return _report(buffer), result, failure, trace.drain()
+
+
+def _report(buffer: io.StringIO) -> tuple:
+    text, events = status.drain()
+    return buffer.getvalue() + text, events
+
+
+def run(ctx, fn, calls, jobs: int = 1):
+    """Calls `fn(ctx, *args)` for each `args` in `calls` and returns the results.
+
+    With `jobs > 1` the calls are spread over `jobs` forked processes, which are handed
+    calls (in order) as they free up. Each call's output is printed as one block, in
+    the same order as `calls`. Once a call fails, no later calls are started and the
+    first call to fail (in order) has its exception re-raised, with the worker's
+    traceback as its cause — much like the serial loop. Unlike the serial loop, later
+    calls that were already running when the failure was seen do finish; their output
+    is printed too, after a warning naming how many there were.
+
+    :params fn: module-level function (it must be importable by the workers)
+    :params calls: list of argument-tuples, one per call
+
+    :returns: list of whatever `fn` returned, in the order of `calls`
+    """
+    if jobs <= 1 or len(calls) <= 1:
+        return [fn(ctx, *args) for args in calls]
+
+    global _ctx, _calls
+    _ctx, _calls = ctx, calls
+
+    # Anything still buffered would otherwise be flushed again by every worker
+    sys.stdout.flush()
+
+    done, running = {}, {}
+    stop = len(calls)  # calls from here on aren't started
+    context = mp.get_context("fork")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        upcoming = 0
+        while upcoming < stop or running:
+            while upcoming < stop and len(running) < jobs:
+                running[pool.submit(_call, fn, upcoming)] = upcoming
+                upcoming += 1
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                idx = running.pop(future)
+                done[idx] = future.result()
+                if done[idx][2] is not None:
+                    stop = min(stop, idx + 1)
+
+    results, failure = [], None
+    for idx in sorted(done):
+        (output, events), result, failed, spans = done[idx]
+        if idx == stop and failure is not None:
+            n = len(done) - idx
+            status.warn(f"{n} later call(s) had started before call {idx} failed.")
+        status.merge(output, events)
+        trace.merge(spans)
+
+        if failure is None and failed is not None:
+            failure = failed
+        results.append(result)
+
+    if failure is not None:
+        error, remote = failure
+        raise error from RemoteTraceback(remote)
+
+    return results
@@ -15,14 +15,11 @@ def roles(role):
     """Takes in two: `<sem>-<group>-<role>`. Returns ordering by `<sem>` and `<role>`.
     """
     from ..components import website
-    officers = website.load_config("officers")
-    officers = [x.lower().replace(" ", "-") for x in officers]
+    ranks = website.officer_ranks()
 
-    rank = semester(role)
-    rank *= len(officers)
-    for idx, officer in enumerate(officers[::-1]):
-        if role.endswith(officer):
-            rank -= (len(officers) - idx)
-            break
+    # of all the officers `role` ends with, the one listed last in `officers` wins
+    parts = role.split("-")
+    suffixes = ["-".join(parts[idx:]) for idx in range(len(parts))]
+    offset = max([ranks.get(suffix, 0) for suffix in suffixes])
 
-    return rank
\ No newline at end of file
+    return semester(role) * len(ranks) - offset
@@ -1,31 +1,101 @@
+"""Reports progress as Markdown, and as a stream of structured events.
+
+Messages are buffered, and written out in one go by `flush` (at the end of every task,
+see `trace.Traced`, and when the process exits). Alongside the Markdown, every message
+is recorded as an event:
+
+    {"task": ..., "stage": ..., "meeting": ..., "level": ..., "message": ...,
+     "tag": ...}
+
+where `level` is one of "info" (headings), "success", "warning", or "error", and `tag`
+is whatever the caller used to tell a kind of message apart (or ""). If
+`AUTOBOT_EVENTS` names a file, `flush` appends the events to it as JSON lines (this is
+what `entrypoint.sh` reads). Worker pools hand their buffers back with `drain`/`merge`,
+so events from parallel Meetings never interleave.
+"""
+import io
+import os
+import sys
+import json
+import atexit
 from typing import Union
 
+_emojize = None
+
+# callables that are told about every message as `fn(kind, msg)`, where `kind` is
+#   "begin", "success", "fail", or "warn" (e.g. `bench` uses these to time stages)
+observers = []
+
+LEVELS = {
+    "heading": "info",
+    "begin": "info",
+    "success": "success",
+    "warn": "warning",
+    "fail": "error",
+}
+
+_text = io.StringIO()
+_events = []
+_where = {"task": "", "stage": "", "meeting": ""}
+
+
+def _notify(kind: str, msg: str):
+    for fn in observers:
+        fn(kind, msg)
+
 
 def _print(msg, prefix: Union[bool, str] = "1. "):
-    import emoji
+    global _emojize
+    if _emojize is None:
+        import emoji
+
+        _emojize = emoji.emojize
 
-    fn = emoji.emojize
+        # import emojis
+        # _emojize = emojis.encode
+
+    fn = _emojize
 
-    # import emojis
-    # fn = emojis.encode
     if prefix:
-        print(prefix, end="")
-    print(fn(msg.strip(), use_aliases=True))
+        _text.write(prefix)
+    _text.write(fn(msg.strip(), use_aliases=True))
+    _text.write("\n")
+
 
+def _record(kind: str, msg: str, tag: str = ""):
+    _events.append(dict(_where, level=LEVELS[kind], message=msg.strip(), tag=tag))
 
-def begin(msg, prefix="## "):
+
+def heading(msg, prefix="# "):
+    """Starts a task's report."""
+    _where.update(task=msg.strip(), stage="", meeting="")
+    _record("heading", msg)
     _print(msg, prefix)
 
 
-def success(s: str = "", prefix: str = "1. "):
+def begin(msg, prefix="## ", meeting: str = ""):
+    """Starts a stage; stages about a single Meeting should name it as `meeting`."""
+    _where.update(stage=msg.strip(), meeting=meeting)
+    _notify("begin", msg)
+    _record("begin", msg)
+    _print(msg, prefix)
+
+
+def success(s: str = "", prefix: str = "1. ", tag: str = ""):
+    _notify("success", s)
+    _record("success", s, tag)
     _print(f":white_check_mark: {s}", prefix)
 
 
-def fail(s: str = "", prefix: str = "1. "):
+def fail(s: str = "", prefix: str = "1. ", tag: str = ""):
+    _notify("fail", s)
+    _record("fail", s, tag)
     _print(f":x: {s}", prefix)
 
 
-def warn(s: str = "", prefix: str = "1. "):
+def warn(s: str = "", prefix: str = "1. ", tag: str = ""):
+    _notify("warn", s)
+    _record("warn", s, tag)
     _print(f":rotating_light: {s}", prefix)
 
 
@@ -36,3 +106,45 @@ def test(assertion, msg, halt: bool = True):
         fail(msg)
         if halt:
             exit(-1)
+
+
+# region Buffering
+def drain() -> tuple:
+    """Hands over (and forgets) everything buffered so far.
+
+    :returns: the buffered Markdown, and the buffered events
+    """
+    global _text, _events
+    text, events = _text.getvalue(), _events
+    _text, _events = io.StringIO(), []
+
+    return text, events
+
+
+def merge(text: str, events: list):
+    """Buffers what another process `drain`ed, as if it were reported here."""
+    _text.write(text)
+    _events.extend(events)
+
+
+def flush():
+    """Writes out the buffered Markdown (to stdout) and events (to `AUTOBOT_EVENTS`)."""
+    text, events = drain()
+    if text:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    path = os.environ.get("AUTOBOT_EVENTS", "")
+    if path and events:
+        with open(path, "a") as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+
+
+def _forked():
+    # Workers start with empty buffers; `pool` merges whatever they report
+    drain()
+
+
+atexit.register(flush)
+os.register_at_fork(after_in_child=_forked)
+# endregion
@@ -0,0 +1,268 @@
+"""Times tasks by stage, and writes the timings as a Chrome trace.
+
+Tasks made with `@task(klass=Traced)` take two more flags:
+
+    inv meeting.publish --trace publish.json  # open in chrome://tracing or Perfetto
+    inv meeting.publish --profile             # writes `meeting.publish.prof`
+
+While a trace is recorded, each `status.begin` closes the current stage's span and opens
+the next, and `status.success`/`fail`/`warn` are marked on it. Spans carry their wall
+time, CPU time, and counters: `files_written` (files opened for writing) and
+`http_calls` (requests sent by `requests`, which includes talking to Docker). Code that
+wants its own span (e.g. around `nbconvert`) can use `with trace.span("...")`.
+
+Stages that run on a worker pool (see `pool`) are recorded by the worker and handed
+back, so they show up as a separate process in the trace.
+"""
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+from invoke import Task
+from invoke.parser import Argument
+
+from . import status
+
+# the trace being recorded, if any
+_tracer = None
+
+
+class _Span:
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind  # "task", "stage", or "span"
+        self.ok = True
+        self.counts = {"files_written": 0, "http_calls": 0}
+        self.start = time.perf_counter_ns()
+        self.cpu = time.process_time()
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self.stack = []
+        self.lock = threading.Lock()
+
+    def _event(self, **event) -> dict:
+        event.update(pid=os.getpid(), tid=threading.get_ident())
+        self.events.append(event)
+        return event
+
+    def open(self, name: str, kind: str):
+        # a stage lasts until the next one begins (or its task ends)
+        if kind == "stage" and self.stack and self.stack[-1].kind == "stage":
+            self.close()
+
+        self.stack.append(_Span(name, kind))
+
+    def close(self, kind: str = ""):
+        """Closes the innermost span (and, given a `kind`, anything opened in it)."""
+        if kind:
+            while self.stack and self.stack[-1].kind != kind:
+                self.close()
+
+        span = self.stack.pop()
+        if self.stack:
+            for key, count in span.counts.items():
+                self.stack[-1].counts[key] += count
+
+        args = dict(span.counts, cpu_ms=(time.process_time() - span.cpu) * 1e3)
+        if not span.ok:
+            args["failed"] = True
+
+        self._event(
+            name=span.name,
+            cat=span.kind,
+            ph="X",
+            ts=span.start / 1e3,
+            dur=(time.perf_counter_ns() - span.start) / 1e3,
+            args=args,
+        )
+
+    def mark(self, kind: str, msg: str):
+        if self.stack and kind == "fail":
+            self.stack[-1].ok = False
+
+        ts = time.perf_counter_ns() / 1e3
+        self._event(name=kind, cat="status", ph="i", s="t", ts=ts, args={"msg": msg})
+
+    def count(self, key: str):
+        with self.lock:
+            if self.stack:
+                self.stack[-1].counts[key] += 1
+
+    def drain(self) -> list:
+        """Closes any open stages, and hands over (and forgets) everything recorded."""
+        while self.stack and self.stack[-1].kind == "stage":
+            self.close()
+
+        events, self.events = self.events, []
+        return events
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+# region Hooks
+def _observe(kind: str, msg: str):
+    if _tracer is None:
+        return
+
+    if kind == "begin":
+        _tracer.open(msg.strip(), "stage")
+    else:
+        _tracer.mark(kind, msg.strip())
+
+
+def _audit(event: str, args: tuple):
+    if _tracer is None or event != "open":
+        return
+
+    _, mode, flags = args
+    if mode is None:
+        writing = flags & (os.O_WRONLY | os.O_RDWR)
+    else:
+        writing = any(x in mode for x in "wax+")
+
+    if writing:
+        _tracer.count("files_written")
+
+
+_hooked = False
+
+
+def _hook():
+    """Installs the hooks feeding the counters (once; they're idle unless tracing)."""
+    global _hooked
+    if _hooked:
+        return
+
+    from requests.adapters import HTTPAdapter
+
+    send = HTTPAdapter.send
+
+    def _send(self, *args, **kwargs):
+        if _tracer is not None:
+            _tracer.count("http_calls")
+        return send(self, *args, **kwargs)
+
+    HTTPAdapter.send = _send
+    sys.addaudithook(_audit)
+    status.observers.append(_observe)
+    _hooked = True
+
+
+def _forked():
+    # Workers start with nothing recorded; `drain` hands their spans back to `pool`
+    if _tracer is not None:
+        _tracer.events, _tracer.stack = [], []
+        _tracer.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forked)
+# endregion
+
+
+@contextmanager
+def span(name: str):
+    """Times the enclosed block as its own span (if a trace is being recorded)."""
+    if _tracer is None:
+        yield
+        return
+
+    _tracer.open(name, "span")
+    try:
+        yield
+    finally:
+        _tracer.close("span")
+
+
+def drain() -> list:
+    return _tracer.drain() if _tracer is not None else []
+
+
+def merge(events: list):
+    """Adds the spans a worker recorded (see `drain`) to this process' trace."""
+    if _tracer is not None:
+        _tracer.events.extend(events)
+
+
+@contextmanager
+def record(name: str, path: str = "", profile: bool = False):
+    """Traces (and/or profiles) the task `name`.
+
+    Tasks called from within a traced task (e.g. by `org`) get their own span.
+
+    :params path: where to write the Chrome trace
+    :params profile: whether to run the task under `cProfile`, whose stats are written
+        to `<name>.prof`
+    """
+    global _tracer
+
+    outermost = _tracer is None and bool(path)
+    if outermost:
+        _hook()
+        _tracer = Tracer()
+
+    profiler = cProfile.Profile() if profile else None
+    if _tracer is not None:
+        _tracer.open(name, "task")
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield
+    except BaseException:
+        if _tracer is not None and _tracer.stack:
+            _tracer.stack[-1].ok = False
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(f"{name}.prof")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+        if _tracer is not None:
+            _tracer.close("task")
+        if outermost:
+            _tracer.save(path)
+            _tracer = None
+
+
+class Traced(Task):
+    """A task that also takes `--trace <out.json>` and `--profile`.
+
+    Use it as `@task(klass=Traced)`.
+    """
+
+    def get_arguments(self, *args, **kwargs):
+        arguments = super().get_arguments(*args, **kwargs)
+        arguments += [
+            Argument(
+                names=("trace",),
+                kind=str,
+                default="",
+                help="Write a Chrome trace of the task's stages to this file.",
+            ),
+            Argument(
+                names=("profile",),
+                kind=bool,
+                default=False,
+                help="Run the task under cProfile; stats are written to `<task>.prof`.",
+            ),
+        ]
+
+        return arguments
+
+    def __call__(self, *args, trace: str = "", profile: bool = False, **kwargs):
+        name = f"{self.body.__module__.rsplit('.', 1)[-1]}.{self.name}"
+        try:
+            with record(name, trace, profile):
+                return super().__call__(*args, **kwargs)
+        finally:
+            status.flush()
@@ -1,9 +1,160 @@
 import re
+import os
+import json
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
 
+KINDS = ["youtube", "slides", "github", "kaggle", "colab"]
 
-def youtube(ctx, m):
+_session = None
+
+
+def _get_session(ctx):
+    """Returns the (pooled) `requests.Session` all link checks share."""
+    global _session
+    if _session is None:
+        workers = ctx.settings.links.workers
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+
+    return _session
+
+
+def _check(ctx, url, cached: dict = {}) -> dict:
+    """Checks that `url` resolves, using `HEAD` and falling back to `GET`.
+
+    Some hosts refuse (or mishandle) `HEAD`, so anything but a `200` gets a second
+    chance; the `GET` is streamed and closed without reading the body. If `cached`
+    holds validators from an earlier check, the request is made conditional and a
+    `304` keeps the earlier status.
+
+    :returns: cache entry for `url`
+    """
+    session = _get_session(ctx)
+    timeout = ctx.settings.links.timeout
+
+    headers = {}
+    if cached.get("etag", ""):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last-modified", ""):
+        headers["If-Modified-Since"] = cached["last-modified"]
+
+    entry = {"status": 0, "etag": "", "last-modified": "", "checked": time.time()}
+    try:
+        res = session.head(url, allow_redirects=True, timeout=timeout, headers=headers)
+        if res.status_code == requests.codes.NOT_MODIFIED:
+            return dict(cached, checked=entry["checked"])
+
+        if res.status_code != requests.codes.OK:
+            with session.get(url, stream=True, timeout=timeout) as res:
+                pass
+
+        entry["status"] = res.status_code
+        entry["etag"] = res.headers.get("ETag", "")
+        entry["last-modified"] = res.headers.get("Last-Modified", "")
+    except requests.RequestException:
+        pass
+
+    return entry
+
+
+def _cache_path(ctx) -> Path:
+    """Link checks are cached in the semester's directory, or in `links.cache`."""
+    cache_dir = ctx.settings.links.get("cache", "") or ctx.path
+    return Path(cache_dir) / ".links.json"
+
+
+def _load_cache(ctx) -> dict:
+    try:
+        return json.load(open(_cache_path(ctx), "r"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_cache(ctx, cache: dict):
+    path = _cache_path(ctx)
+    tmp = path.with_name(f"{path.name}.tmp")
+    json.dump(cache, open(tmp, "w"), indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def check(ctx, urls, refresh: bool = False) -> dict:
+    """Concurrently checks every (unique, non-empty) URL in `urls`.
+
+    Results are cached on disk (see `_cache_path`). URLs that resolved less than
+    `links.ttl` seconds ago aren't checked again; older ones are revalidated with
+    conditional requests. Failures are always re-checked. `refresh` bypasses the cache.
+
+    :returns: dict mapping each URL to whether it resolved
+    """
+    urls = sorted({url for url in urls if url})
+    if not urls:
+        return {}
+
+    cache = _load_cache(ctx)
+    ttl = ctx.settings.links.ttl
+    now = time.time()
+
+    def known(url):
+        entry = cache.get(url, {})
+        return not refresh and entry.get("status", 0) == requests.codes.OK
+
+    stale = [url for url in urls if not known(url) or now - cache[url]["checked"] > ttl]
+    if stale:
+        with ThreadPoolExecutor(max_workers=ctx.settings.links.workers) as pool:
+            validators = [cache[url] if known(url) else {} for url in stale]
+            entries = pool.map(lambda args: _check(ctx, *args), zip(stale, validators))
+            cache.update(zip(stale, entries))
+
+        _save_cache(ctx, cache)
+
+    return {url: cache[url]["status"] == requests.codes.OK for url in urls}
+
+
+def candidates(ctx, m) -> dict:
+    """Builds every URL a Meeting might link to, without touching the network."""
+    github_url = _github(ctx, m)
+
+    return {
+        "youtube": _youtube(ctx, m),
+        "slides": _slides(ctx, m),
+        "github": github_url,
+        "kaggle": _kaggle(ctx, m),
+        "colab": _colab(ctx, github_url),
+    }
+
+
+def resolve(ctx, meetings, refresh: bool = False) -> dict:
+    """Checks the links of all `meetings` in one batch.
+
+    Identical URLs are only checked once, and the Colab link is only kept if the GitHub
+    link it's derived from resolves.
+
+    :returns: dict mapping `Meeting.id` to `{kind: url}`, where `url` is `""` for links
+        that don't resolve
+    """
+    links = {m.id: candidates(ctx, m) for m in meetings}
+    urls = [links[m.id][kind] for m in meetings for kind in KINDS[:-1]]
+    valid = check(ctx, urls, refresh=refresh)
+
+    for urls in links.values():
+        for kind in KINDS[:-1]:
+            if not valid.get(urls[kind], False):
+                urls[kind] = ""
+
+        if not urls["github"]:
+            urls["colab"] = ""
+
+    return links
+
+
+def _youtube(ctx, m):
     """Normalizes YouTube URLs."""
     # YouTube URLs take the following form:
     #   https://www.youtube.com/watch?v=dQw4w9WgXcQ
@@ -26,14 +177,12 @@ def youtube(ctx, m):
         # "...|$" returns the empty string if not a match
         url = re.sub(f"{yt_full}|$", "", url)
         url = re.search("([A-Za-z0-9-_]{11})", url).group(0)
-        url = f"https://youtu.be/{url}"
-        if requests.get(url).status_code == requests.codes.OK:
-            return url
+        return f"https://youtu.be/{url}"
 
     return ""
 
 
-def slides(ctx, m):
+def _slides(ctx, m):
     """Normalizes GSlides URLs."""
 
     try:
@@ -41,7 +190,10 @@ def slides(ctx, m):
     except (TypeError, KeyError, AttributeError):
         return ""
 
-    if url and "docs" in url and "presentation" in url:
+    if not url:
+        return ""
+
+    if "docs" in url and "presentation" in url:
         # Google Slides URLs take the following form:
         #   https://docs.google.com/presentation/d/14uUXIrdmXMGChj4dYaCZxcQ-rFonLmKqlSppLu8cY_I
         # remove the protocol, www, and Google Docs' domain name
@@ -51,17 +203,12 @@ def slides(ctx, m):
         url = re.sub(f"{docs_base_url}|$", "", url)
         url = url.split("/", maxsplit=1)[0]
 
-    url = f"https://docs.google.com/presentation/d/{url}"
-
-    if requests.get(url).status_code == requests.codes.OK:
-        return url
-
     # TODO based on how using `slides` in Hugo Academic works out, update this
 
-    return ""
+    return f"https://docs.google.com/presentation/d/{url}"
 
 
-def github(ctx, m):
+def _github(ctx, m):
     """Generates GitHub URLs directly to the meeting notes."""
     # Our GitHub URLs take the form:
     #   https://github.com/ucfai/<meeting.group>/blob/master/<meeting.group.semester>/<meeting>
@@ -78,26 +225,45 @@ def github(ctx, m):
             f"{m.filename}{ctx.settings.suffixes.workbook}",
         ]
     )
-    return url if requests.get(url).status_code == requests.codes.OK else ""
+    return url
 
 
-def kaggle(ctx, m):
+def _kaggle(ctx, m):
     """Generates the Kaggle URL for Kernels to be published on the website."""
     from ..apis.kaggle import slug_kernel
 
     _username = ctx.settings.kaggle.username
-    url = f"https://kaggle.com/{_username}/{slug_kernel(ctx, m)}"
-    return url if requests.get(url).status_code == requests.codes.OK else ""
+    return f"https://kaggle.com/{_username}/{slug_kernel(ctx, m)}"
 
 
-def colab(ctx, m):
+def _colab(ctx, github_url):
     """Generates the a Google Colab URL from the GitHub URL."""
-    url = github(ctx, m)
+    return github_url.replace(
+        ctx.settings["version-control"].platform,
+        "https://colab.research.google.com/github",
+    )
 
-    if url and requests.get(url).status_code == requests.codes.OK:
-        return url.replace(
-            ctx.settings["version-control"].platform,
-            "https://colab.research.google.com/github",
-        )
-    else:
-        return ""
+
+def _valid(ctx, url):
+    return url if check(ctx, [url]).get(url, False) else ""
+
+
+def youtube(ctx, m):
+    return _valid(ctx, _youtube(ctx, m))
+
+
+def slides(ctx, m):
+    return _valid(ctx, _slides(ctx, m))
+
+
+def github(ctx, m):
+    return _valid(ctx, _github(ctx, m))
+
+
+def kaggle(ctx, m):
+    return _valid(ctx, _kaggle(ctx, m))
+
+
+def colab(ctx, m):
+    url = github(ctx, m)
+    return _colab(ctx, url) if url else ""
@@ -0,0 +1,168 @@
+"""A compiled, read-only cache of `group.yml` and `syllabus.yml`.
+
+Round-tripping YAML through ruamel (to keep comments and formatting) is slow, and only
+matters to tasks that write the YAML back. Everyone else can load a JSON copy of its
+plain contents (`.<name>.json`, next to the YAML file) instead. The cache is keyed by
+the file's size and mtime; if those changed, but its content hash didn't (e.g. after a
+`git checkout`), the cache is still used.
+
+The cache lives in the Group's repository, where anyone could commit one, so it's
+plain JSON (rather than, say, a pickle): loading it never runs code, and it can only
+rebuild the classes in `CLASSES`.
+
+Objects loaded from the cache hold plain `dict`s, `list`s, and `str`s, where the
+round-trip loader would give commented ones, so they shouldn't be dumped back to YAML.
+
+Within a process, each file is only read (or parsed) once: later loads rebuild fresh
+objects from what's kept in memory, so tasks chained in one `inv` call (or `org`) share
+the work but not each other's edits. Anything that writes the YAML should use `dump`,
+which forgets what was kept.
+"""
+import os
+import json
+import datetime
+from hashlib import sha256
+from pathlib import Path
+
+VERSION = 2
+# what a cache may rebuild (see `_decompile`)
+CLASSES = ["Group", "Meeting"]
+
+# path -> cache entry, for files already loaded by this process
+_loaded = {}
+
+
+def _cache_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.json")
+
+
+def _compile(data):
+    """Converts round-tripped YAML to plain, JSON-ready data.
+
+    Objects and timestamps become tagged dicts (`{"__class__": ...}`, etc.).
+    """
+    import pandas as pd
+
+    if type(data).__name__ in CLASSES:
+        return {"__class__": type(data).__name__, "state": _compile(vars(data))}
+    if isinstance(data, dict):
+        return {str(key): _compile(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_compile(value) for value in data]
+    if isinstance(data, str):
+        return str(data)
+    if isinstance(data, pd.Timestamp) or data is pd.NaT:
+        return {"__timestamp__": str(data)}
+    if isinstance(data, datetime.date):
+        kind = "datetime" if isinstance(data, datetime.datetime) else "date"
+        return {f"__{kind}__": data.isoformat()}
+    # ruamel's scalars subclass these, but `json` needs the real thing
+    for kind in [bool, int, float]:
+        if isinstance(data, kind):
+            return kind(data)
+    if data is None:
+        return None
+
+    raise TypeError(f"Can't cache a `{type(data).__name__}`.")
+
+
+def _decompile(data):
+    import pandas as pd
+
+    from .. import concepts
+
+    if isinstance(data, dict) and "__class__" in data:
+        if data["__class__"] not in CLASSES:
+            raise ValueError(f"Can't rebuild a `{data['__class__']}`.")
+
+        # the same as ruamel does for registered classes: no `__init__`, just state
+        cls = getattr(concepts, data["__class__"])
+        obj = cls.__new__(cls)
+        obj.__dict__.update(_decompile(data["state"]))
+        return obj
+    if isinstance(data, dict) and "__timestamp__" in data:
+        return pd.Timestamp(data["__timestamp__"])
+    if isinstance(data, dict) and "__datetime__" in data:
+        return datetime.datetime.fromisoformat(data["__datetime__"])
+    if isinstance(data, dict) and "__date__" in data:
+        return datetime.date.fromisoformat(data["__date__"])
+    if isinstance(data, dict):
+        return {key: _decompile(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_decompile(value) for value in data]
+
+    return data
+
+
+def _save(path: Path, entry: dict):
+    cache = _cache_path(path)
+    tmp = cache.with_name(f"{cache.name}.tmp")
+    try:
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # a read-only checkout just doesn't get a cache
+
+
+def load(path: Path, roundtrip: bool = False):
+    """Loads the YAML file at `path`.
+
+    :params roundtrip: whether the result may be dumped back to YAML, in which case it's
+        loaded with ruamel's round-trip loader (and the cache isn't used)
+    """
+    from .. import yaml
+
+    path = Path(path)
+    if roundtrip:
+        return yaml.load(open(path, "r"))
+
+    stat = path.stat()
+    entry = _loaded.get(path, {})
+    if entry and (entry["size"], entry["mtime"]) == (stat.st_size, stat.st_mtime_ns):
+        return _decompile(entry["data"])
+
+    try:
+        entry = json.load(open(_cache_path(path), "r"))
+        if entry["version"] != VERSION:
+            entry = {}
+    except (OSError, ValueError, KeyError, TypeError):
+        entry = {}
+
+    current = (stat.st_size, stat.st_mtime_ns)
+    stale = (entry.get("size", None), entry.get("mtime", None)) != current
+    text = b""
+    if stale:
+        # the content may still match, e.g. after a `git checkout`
+        text = open(path, "rb").read()
+        if entry.get("sha", "") != sha256(text).hexdigest():
+            entry = {}
+
+    try:
+        data = _decompile(entry["data"])
+    except (KeyError, ValueError, TypeError):
+        # a missing (or broken) cache is rebuilt from the YAML
+        text, stale = text or open(path, "rb").read(), True
+        compiled = _compile(yaml.load(text.decode()))
+        entry = {"version": VERSION, "sha": sha256(text).hexdigest(), "data": compiled}
+        data = _decompile(compiled)
+
+    if stale:
+        entry.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+        _save(path, entry)
+    _loaded[path] = entry
+
+    return data
+
+
+def forget(path: Path):
+    _loaded.pop(Path(path), None)
+
+
+def dump(data, path: Path):
+    """Writes `data` to `path` as YAML (with ruamel), and forgets any cached copy."""
+    from .. import yaml
+
+    path = Path(path)
+    yaml.dump(data, open(path, "w"))
+    forget(path)
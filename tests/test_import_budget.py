@@ -0,0 +1,50 @@
+"""Keeps `inv --list` (and so every task's startup) fast.
+
+Heavy dependencies must only be imported inside the tasks that need them; a top-level
+import of any of `HEAVY` in a collected module fails these tests. The time budget can
+be loosened on slow machines with `AUTOBOT_IMPORT_BUDGET` (in seconds).
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+BUDGET = float(os.environ.get("AUTOBOT_IMPORT_BUDGET", "1.5"))
+
+HEAVY = ["pandas", "jinja2", "nbconvert", "docker", "requests"]
+
+# imports the collection just like `inv` does, and reports what got imported with it
+IMPORT = """
+import sys, json, importlib
+
+sys.path.insert(0, sys.argv[1])
+importlib.import_module(sys.argv[2])
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _run(*args) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def test_list_is_within_budget():
+    args = ["-m", "invoke", "--search-root", str(ROOT.parent), "-c", ROOT.name]
+
+    _run(*args, "--list")  # warm the filesystem (and bytecode) caches
+    start = time.perf_counter()
+    _run(*args, "--list")
+    took = time.perf_counter() - start
+
+    assert took < BUDGET, f"`inv --list` took {took:.2f}s (budget: {BUDGET:.2f}s)"
+
+
+def test_collection_skips_heavy_dependencies():
+    modules = json.loads(_run("-c", IMPORT, str(ROOT.parent), ROOT.name).stdout)
+    imported = [x for x in HEAVY if x in modules]
+
+    assert not imported, f"Importing the collection imported {imported}"